@@ -0,0 +1 @@
+"""Benchmarks for CarLog; run with ``python -m benchmarks``."""
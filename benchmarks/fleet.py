@@ -0,0 +1,108 @@
+"""Deterministic synthetic fleets, written in the CarLog storage layout."""
+from __future__ import annotations
+
+import json
+import os
+import random
+
+from custom_components.carlog import _ensure_ui_defaults
+from custom_components.carlog.const import (
+    DEFAULT_MAINTENANCE_TYPES,
+    STORAGE_KEY,
+    STORAGE_KEY_INDEX,
+    STORAGE_VERSION,
+)
+from custom_components.carlog.repository import CarRepository
+from custom_components.carlog.summary import file_stamp, summarize
+from custom_components.carlog.timestamps import to_us
+
+_START_US = to_us("2012-01-01T00:00:00+00:00")
+_DAY_US = 86_400_000_000
+# Fill-ups are spread over this many days, whatever their number
+_HISTORY_DAYS = 12 * 365
+
+
+def car_ids(cars: int) -> list[str]:
+    return [f"car{n:04d}" for n in range(cars)]
+
+
+def generate_car(car_id: str, fills: int, seed: int) -> dict:
+    """Shard contents of one car with the given number of fill-ups."""
+    rng = random.Random(f"{seed}:{car_id}")
+    rate = rng.uniform(4.5, 9.0)
+    price_per_liter = rng.uniform(1.6, 2.1)
+    step_us = _HISTORY_DAYS * _DAY_US // max(fills, 1)
+
+    columns: dict[str, list] = {"ts": [], "odometer_km": [], "liters": [], "price_total": []}
+    ts = _START_US
+    km = float(rng.randint(0, 50_000))
+    for _ in range(fills):
+        ts += rng.randint(step_us // 2, step_us * 3 // 2)
+        distance = rng.uniform(300, 900)
+        km += distance
+        liters = round(distance * rate * rng.uniform(0.9, 1.1) / 100, 2)
+        columns["ts"].append(ts)
+        columns["odometer_km"].append(round(km, 1))
+        columns["liters"].append(liters)
+        # Some fill-ups are logged without a price
+        columns["price_total"].append(round(liters * price_per_liter, 2) if rng.random() > 0.1 else None)
+
+    maintenance: dict[str, list[dict]] = {}
+    first_km = columns["odometer_km"][0] if fills else km
+    for maint_type, rule in DEFAULT_MAINTENANCE_TYPES.items():
+        entries = maintenance[maint_type] = []
+        due_km = first_km + rule["interval_km"]
+        for at_ts, at_km in zip(columns["ts"], columns["odometer_km"]):
+            if at_km >= due_km:
+                entries.append({"ts": at_ts + 3_600_000_000, "odometer_km": at_km, "note": ""})
+                due_km = at_km + rule["interval_km"]
+
+    meta = {
+        "name": car_id,
+        "odometer_km": round(km, 1),
+        "tank_capacity_l": 50.0,
+        "maintenance_defaults": DEFAULT_MAINTENANCE_TYPES,
+    }
+    return {"fuel": columns, "maintenance": maintenance, "meta": meta, "journal_seq": 0}
+
+
+def _write(storage_dir: str, key: str, data: dict) -> int:
+    raw = json.dumps(
+        {"version": STORAGE_VERSION, "minor_version": 1, "key": key, "data": data}, separators=(",", ":")
+    ).encode()
+    with open(os.path.join(storage_dir, key), "wb") as file:
+        file.write(raw)
+    return len(raw)
+
+
+def write_fleet(config_dir: str, cars: int, fills: int, seed: int, summaries: bool = True) -> int:
+    """Write the index and one shard and state file per car; returns the bytes written.
+
+    With summaries the state files look like after a clean shutdown, so a
+    start does not need to load any history.
+    """
+    storage_dir = os.path.join(config_dir, ".storage")
+    os.makedirs(storage_dir, exist_ok=True)
+    index: dict = {"cars": {}}
+    written = 0
+    for car_id in car_ids(cars):
+        key = f"{STORAGE_KEY}.{car_id}"
+        car = generate_car(car_id, fills, seed)
+        index["cars"][car_id] = {"key": key}
+        written += _write(storage_dir, key, car)
+        # Drafts as a first start leaves them, so a start has none to write
+        _ensure_ui_defaults(car)
+        state = {"ui": car.pop("ui")}
+        repo = CarRepository(car)
+        if fills:
+            # Long-term statistics already published, as after any earlier start
+            state["statistics"] = {
+                "count": fills,
+                "last_ts": repo.fuel.latest()["ts"],
+                "revision": repo.fuel_revision,
+            }
+        if summaries:
+            state["summary"] = summarize(repo, 0, file_stamp(os.path.join(storage_dir, key)))
+        written += _write(storage_dir, f"{key}.state", state)
+    written += _write(storage_dir, STORAGE_KEY_INDEX, index)
+    return written
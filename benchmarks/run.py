@@ -0,0 +1,245 @@
+"""Benchmark CarLog against synthetic fleets and emit one JSON line per scenario.
+
+Usage (from the repository root)::
+
+    python -m benchmarks                       # default scenarios
+    python -m benchmarks --cars 10 100 --fills 100 1000 --output bench.jsonl
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import datetime as dt
+import itertools
+import json
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from . import standin
+
+HomeAssistant = standin.install()
+
+import custom_components.carlog as carlog  # noqa: E402
+from custom_components.carlog.columns import np  # noqa: E402
+from custom_components.carlog.const import DOMAIN  # noqa: E402
+from custom_components.carlog.instrumentation import get_instrumentation  # noqa: E402
+from custom_components.carlog.maintenance import _maintenance_due, maintenance_types  # noqa: E402
+from custom_components.carlog.timestamps import to_iso  # noqa: E402
+
+from .fleet import car_ids, write_fleet  # noqa: E402
+
+# Bumped when the meaning or layout of the emitted metrics changes
+RESULT_SCHEMA = 3
+
+# (cars, fill-ups per car)
+DEFAULT_SCENARIOS = [(10, 100), (10, 10_000), (100, 1_000), (1_000, 100)]
+
+
+def _summary(samples: list[float]) -> dict:
+    """Latency summary in milliseconds."""
+    if not samples:
+        return {"n": 0}
+    ordered = sorted(samples)
+    return {
+        "n": len(ordered),
+        "total_ms": round(sum(ordered) * 1000, 3),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 4),
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 4),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 4),
+        "max_ms": round(ordered[-1] * 1000, 4),
+    }
+
+
+def _fanout(calls: int) -> dict:
+    counters = standin.COUNTERS
+    return {
+        "signals_per_call": round(counters.signals_sent / calls, 2),
+        "receivers_per_call": round(counters.receivers_called / calls, 2),
+        "state_writes_per_call": round(counters.states_written / calls, 2),
+    }
+
+
+def _saves() -> dict:
+    saves = standin.COUNTERS.saves
+    return {
+        "files": len(saves),
+        "bytes": sum(size for _, size, _ in saves),
+        "write_ms": round(sum(seconds for _, _, seconds in saves) * 1000, 3),
+    }
+
+
+def _render(entities: list) -> float:
+    """Seconds to compute state and attributes of entities, as a state write does."""
+    start = time.perf_counter()
+    for entity in entities:
+        _ = (entity.state, entity.extra_state_attributes)
+    return time.perf_counter() - start
+
+
+async def _flush(storage) -> dict:
+    standin.COUNTERS.reset()
+    start = time.perf_counter()
+    await storage.async_flush()
+    return {"duration_ms": round((time.perf_counter() - start) * 1000, 3), **_saves()}
+
+
+async def _timed_calls(hass, service: str, payloads: list[dict]) -> dict:
+    standin.COUNTERS.reset()
+    latencies = []
+    for data in payloads:
+        start = time.perf_counter()
+        await hass.services.async_call(DOMAIN, service, data, blocking=True)
+        latencies.append(time.perf_counter() - start)
+    return {"latency": _summary(latencies), **_fanout(len(payloads))}
+
+
+async def run_scenario(cars: int, fills: int, seed: int, ops: int, sample: int) -> dict:
+    config_dir = tempfile.mkdtemp(prefix="carlog-bench-")
+    try:
+        fleet_bytes = write_fleet(config_dir, cars, fills, seed)
+        rng = random.Random(seed)
+        ids = car_ids(cars)
+        sampled = rng.sample(ids, min(sample, cars))
+        metrics: dict = {"fleet_bytes": fleet_bytes}
+
+        hass = HomeAssistant(config_dir)
+        standin.COUNTERS.reset()
+        start = time.perf_counter()
+        await carlog.async_setup(hass, {})
+        metrics["async_setup_ms"] = round((time.perf_counter() - start) * 1000, 3)
+
+        entry_times = []
+        for car_id in ids:
+            start = time.perf_counter()
+            await carlog.async_setup_entry(hass, standin.ConfigEntry(car_id, car_id, 50.0))
+            entry_times.append(time.perf_counter() - start)
+        metrics["async_setup_entry"] = {"latency": _summary(entry_times), **_fanout(cars)}
+        # Nothing may be written before start; then at most one flush
+        saves_before_start = _saves()
+        standin.COUNTERS.reset()
+        await hass.async_start()
+        storage = hass.data[DOMAIN]["storage"]
+        # What started tasks (statistics sync) loaded on top of the report
+        await hass.async_block_till_done()
+        metrics["startup"] = {
+            "report": get_instrumentation(hass).startup,
+            "saves_before_start": saves_before_start,
+            "saves_at_start": _saves(),
+            "histories_loaded_settled": sum(storage.history_loaded(car_id) for car_id in ids),
+        }
+
+        def repo(car_id: str):
+            return storage.repository(car_id)
+
+        services = {}
+        log_payloads = []
+        for n in range(ops):
+            car_id = sampled[n % len(sampled)]
+            latest = repo(car_id).fuel.latest()
+            km = (latest["odometer_km"] if latest else 0) + 500 * (n // len(sampled) + 1)
+            log_payloads.append({"car_id": car_id, "odometer_km": km, "liters": 35.0, "price_total": 63.0})
+        services["log_fuel"] = await _timed_calls(hass, "log_fuel", log_payloads)
+
+        update_payloads = []
+        for n in range(ops):
+            car_id = sampled[n % len(sampled)]
+            fuel = repo(car_id).fuel
+            entry = fuel[rng.randrange(len(fuel))]
+            update_payloads.append({"car_id": car_id, "ts": to_iso(entry["ts"]), "liters": entry["liters"] + 0.5})
+        services["update_fuel_entry"] = await _timed_calls(hass, "update_fuel_entry", update_payloads)
+
+        # Removes the latest fill-up of each car, undoing log_fuel
+        delete_payloads = [{"car_id": sampled[n % len(sampled)]} for n in range(ops)]
+        services["delete_fuel_entry"] = await _timed_calls(hass, "delete_fuel_entry", delete_payloads)
+        metrics["services"] = services
+
+        metrics["flush"] = await _flush(storage)
+
+        # Cars started from their summary; load the rest of the histories
+        load_times = []
+        for car_id in ids:
+            if not storage.history_loaded(car_id):
+                start = time.perf_counter()
+                await storage.async_get_car(car_id)
+                load_times.append(time.perf_counter() - start)
+        metrics["history_load"] = _summary(load_times)
+
+        for car_id in ids:
+            storage.async_schedule_save(car_id, force=True)
+        metrics["full_save"] = await _flush(storage)
+
+        fuel_stats, maintenance_due, cold, warm = [], [], [], []
+        for car_id in sampled:
+            car_repo = repo(car_id)
+            start = time.perf_counter()
+            car_repo.fuel_stats.rebuild()
+            fuel_stats.append(time.perf_counter() - start)
+
+            meta = car_repo.car["meta"]
+            for maint_type in maintenance_types(meta):
+                last = car_repo.maintenance(maint_type).latest()
+                start = time.perf_counter()
+                _maintenance_due(meta, maint_type, last, meta.get("odometer_km"))
+                maintenance_due.append(time.perf_counter() - start)
+
+            entities = hass.config_entries.entities[f"entry_{car_id}"]
+            # A new revision drops the memoized values, as after a change
+            car_repo.bump()
+            cold.append(_render(entities))
+            warm.append(_render(entities))
+        metrics["sensors"] = {
+            "fuel_stats_rebuild": _summary(fuel_stats),
+            "maintenance_due": _summary(maintenance_due),
+            "car_states_cold": _summary(cold),
+            "car_states_memoized": _summary(warm),
+        }
+        return metrics
+    finally:
+        shutil.rmtree(config_dir, ignore_errors=True)
+
+
+def _scenarios(args: argparse.Namespace) -> list[tuple[int, int]]:
+    if args.cars or args.fills:
+        return list(itertools.product(args.cars or [10], args.fills or [100]))
+    return DEFAULT_SCENARIOS
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.splitlines()[0])
+    parser.add_argument("--cars", type=int, nargs="+", help="fleet sizes (default: built-in scenarios)")
+    parser.add_argument("--fills", type=int, nargs="+", help="fill-ups per car")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--ops", type=int, default=50, help="calls per service")
+    parser.add_argument("--sample", type=int, default=20, help="cars used for service calls and sensors")
+    parser.add_argument("--output", help="append JSON lines here instead of stdout")
+    args = parser.parse_args(argv)
+
+    environment = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np is not None,
+    }
+    out = open(args.output, "a", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for cars, fills in _scenarios(args):
+            print(f"carlog benchmark: {cars} cars x {fills} fill-ups", file=sys.stderr)
+            metrics = asyncio.run(run_scenario(cars, fills, args.seed, args.ops, args.sample))
+            result = {
+                "schema": RESULT_SCHEMA,
+                "benchmark": "carlog",
+                "at": dt.datetime.now(dt.timezone.utc).isoformat(timespec="seconds"),
+                "scenario": {"cars": cars, "fills": fills, "seed": args.seed, "ops": args.ops, "sample": args.sample},
+                "environment": environment,
+                "metrics": metrics,
+            }
+            out.write(json.dumps(result, sort_keys=True) + "\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
@@ -0,0 +1,360 @@
+"""Lightweight stand-ins for the parts of Home Assistant CarLog uses.
+
+``install()`` registers fake ``homeassistant`` modules so the integration can
+be imported and driven without a Home Assistant installation. They keep
+counters the benchmarks report: dispatcher fan-out, state writes and store
+saves. Timers never fire on their own; the runner flushes explicitly so the
+measurements do not depend on wall-clock delays. ``hass.async_start()`` runs
+what the integration deferred until Home Assistant has started, and
+``hass.async_block_till_done()`` waits for the tasks it created.
+"""
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+import enum
+import importlib
+import json
+import os
+import sys
+import time
+import types
+
+
+class Counters:
+    """Counts of the work the integration asked Home Assistant to do."""
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self.signals_sent = 0
+        self.receivers_called = 0
+        self.states_written = 0
+        self.saves: list[tuple[str, int, float]] = []
+
+
+COUNTERS = Counters()
+
+
+def _module(name: str) -> types.ModuleType:
+    module = types.ModuleType(name)
+    sys.modules[name] = module
+    parent, _, child = name.rpartition(".")
+    if parent:
+        setattr(sys.modules[parent], child, module)
+    return module
+
+
+def _install_voluptuous() -> None:
+    """Just enough of voluptuous for the schemas built at import time."""
+    try:
+        import voluptuous  # noqa: F401
+    except ImportError:
+        pass
+    else:
+        return
+    vol = _module("voluptuous")
+    vol.ALLOW_EXTRA = 1
+    vol.Schema = lambda schema, extra=None: (lambda value: value)
+    vol.Required = vol.Optional = lambda key, default=None, **kwargs: key
+    vol.All = lambda *validators: (lambda value: value)
+    vol.Coerce = lambda kind: kind
+    vol.Range = lambda **kwargs: (lambda value: value)
+    vol.In = lambda container: (lambda value: value)
+
+
+def install() -> type:
+    """Register the stand-in modules and return the HomeAssistant class."""
+    _install_voluptuous()
+    for name in ("homeassistant", "homeassistant.helpers", "homeassistant.components", "homeassistant.util"):
+        _module(name)
+
+    const = _module("homeassistant.const")
+
+    class Platform(str, enum.Enum):
+        SENSOR = "sensor"
+        BINARY_SENSOR = "binary_sensor"
+        NUMBER = "number"
+        TEXT = "text"
+        SELECT = "select"
+        DATE = "date"
+        BUTTON = "button"
+
+    const.Platform = Platform
+    const.UnitOfLength = types.SimpleNamespace(KILOMETERS="km")
+    const.UnitOfVolume = types.SimpleNamespace(LITERS="L")
+    const.EVENT_HOMEASSISTANT_FINAL_WRITE = "homeassistant_final_write"
+
+    class EntityCategory(str, enum.Enum):
+        CONFIG = "config"
+        DIAGNOSTIC = "diagnostic"
+
+    const.EntityCategory = EntityCategory
+
+    core = _module("homeassistant.core")
+
+    def callback(func):
+        func._hass_callback = True
+        return func
+
+    core.callback = callback
+    core.CALLBACK_TYPE = object
+    core.Event = object
+    core.ServiceResponse = dict
+
+    class SupportsResponse(enum.Enum):
+        NONE = "none"
+        OPTIONAL = "optional"
+        ONLY = "only"
+
+    core.SupportsResponse = SupportsResponse
+
+    class ServiceCall:
+        def __init__(self, domain: str, service: str, data: dict) -> None:
+            self.domain = domain
+            self.service = service
+            self.data = data
+
+    core.ServiceCall = ServiceCall
+
+    class Bus:
+        def async_listen_once(self, event_type, listener):
+            return lambda: None
+
+    class Services:
+        def __init__(self) -> None:
+            self._handlers = {}
+
+        def async_register(self, domain, service, handler, schema=None, supports_response=None):
+            self._handlers[(domain, service)] = handler
+
+        async def async_call(self, domain, service, data, blocking=False, return_response=False):
+            return await self._handlers[(domain, service)](ServiceCall(domain, service, data))
+
+    class Config:
+        def __init__(self, config_dir: str) -> None:
+            self.config_dir = config_dir
+            self.components = {"recorder"}
+
+        def path(self, *parts: str) -> str:
+            return os.path.join(self.config_dir, *parts)
+
+        def is_allowed_path(self, path: str) -> bool:
+            return True
+
+    class ConfigEntries:
+        def __init__(self, hass) -> None:
+            self.hass = hass
+            self.entities: dict[str, list] = {}
+
+        async def async_forward_entry_setups(self, entry, platforms) -> None:
+            entities = self.entities.setdefault(entry.entry_id, [])
+            for platform in platforms:
+                module = importlib.import_module(f"custom_components.carlog.{platform.value}")
+                added: list = []
+                await module.async_setup_entry(self.hass, entry, lambda new, update_before_add=False: added.extend(new))
+                for entity in added:
+                    entity.entity_id = f"{platform.value}.{entity._attr_unique_id}"
+                    await entity.async_added_to_hass()
+                    entity.async_write_ha_state()
+                entities.extend(added)
+
+        async def async_unload_platforms(self, entry, platforms) -> bool:
+            for entity in self.entities.pop(entry.entry_id, []):
+                await entity.async_will_remove_from_hass()
+                for unsub in entity._on_remove:
+                    unsub()
+            return True
+
+        def async_update_entry(self, entry, data=None, version=None) -> None:
+            pass
+
+    class HomeAssistant:
+        def __init__(self, config_dir: str) -> None:
+            self.data: dict = {}
+            self.bus = Bus()
+            self.services = Services()
+            self.config = Config(config_dir)
+            self.config_entries = ConfigEntries(self)
+            self.loop = asyncio.get_running_loop()
+            self.started = False
+            self._at_started: list = []
+            self._tasks: set = set()
+
+        async def async_add_executor_job(self, func, *args):
+            return await self.loop.run_in_executor(None, func, *args)
+
+        def async_create_task(self, coro, name=None, eager_start=False):
+            task = self.loop.create_task(coro)
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            return task
+
+        async def async_block_till_done(self) -> None:
+            while self._tasks:
+                await asyncio.gather(*self._tasks)
+
+        async def async_start(self) -> None:
+            self.started = True
+            callbacks, self._at_started = self._at_started, []
+            for at_started in callbacks:
+                result = at_started(self)
+                if asyncio.iscoroutine(result):
+                    await result
+
+    core.HomeAssistant = HomeAssistant
+
+    exceptions = _module("homeassistant.exceptions")
+    exceptions.HomeAssistantError = type("HomeAssistantError", (Exception,), {})
+
+    dispatcher = _module("homeassistant.helpers.dispatcher")
+    signals: dict[str, list] = {}
+
+    def async_dispatcher_connect(hass, signal, target):
+        signals.setdefault(signal, []).append(target)
+        return lambda: signals[signal].remove(target)
+
+    def async_dispatcher_send(hass, signal, *args):
+        COUNTERS.signals_sent += 1
+        for target in list(signals.get(signal, ())):
+            COUNTERS.receivers_called += 1
+            if not getattr(target, "_hass_callback", False) and not asyncio.iscoroutinefunction(target):
+                # Home Assistant runs such a target in the executor, off the event loop
+                raise RuntimeError(f"Dispatcher target {target!r} is not a callback")
+            target(*args)
+
+    dispatcher.async_dispatcher_connect = async_dispatcher_connect
+    dispatcher.async_dispatcher_send = async_dispatcher_send
+
+    storage = _module("homeassistant.helpers.storage")
+
+    class Store:
+        """Same file layout as Home Assistant's Store, written synchronously."""
+
+        def __init__(self, hass, version, key, private=False, *, atomic_writes=False, minor_version=1):
+            self.hass = hass
+            self.version = version
+            self.minor_version = minor_version
+            self.key = key
+            self.path = hass.config.path(".storage", key)
+
+        async def async_load(self):
+            if not os.path.exists(self.path):
+                return None
+            with open(self.path, encoding="utf-8") as file:
+                stored = json.load(file)
+            if stored["version"] != self.version:
+                return await self._async_migrate_func(
+                    stored["version"], stored.get("minor_version", 1), stored["data"]
+                )
+            return stored["data"]
+
+        async def _async_migrate_func(self, old_major_version, old_minor_version, old_data):
+            raise NotImplementedError
+
+        async def async_save(self, data) -> None:
+            start = time.perf_counter()
+            payload = {"version": self.version, "minor_version": self.minor_version, "key": self.key, "data": data}
+            raw = json.dumps(payload, separators=(",", ":")).encode()
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "wb") as file:
+                file.write(raw)
+            COUNTERS.saves.append((self.key, len(raw), time.perf_counter() - start))
+
+        async def async_remove(self) -> None:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    storage.Store = Store
+
+    _module("homeassistant.helpers.entity_platform").AddEntitiesCallback = object
+
+    def async_at_started(hass, at_start_cb):
+        if hass.started:
+            result = at_start_cb(hass)
+            if asyncio.iscoroutine(result):
+                hass.async_create_task(result)
+        else:
+            hass._at_started.append(at_start_cb)
+        return lambda: None
+
+    _module("homeassistant.helpers.start").async_at_started = async_at_started
+
+    event = _module("homeassistant.helpers.event")
+    event.async_call_later = lambda hass, delay, action: (lambda: None)
+    event.async_track_point_in_utc_time = lambda hass, action, point: (lambda: None)
+
+    util_dt = _module("homeassistant.util.dt")
+    util_dt.utcnow = lambda: dt.datetime.now(dt.timezone.utc)
+    util_dt.as_local = lambda value: value.astimezone(dt.timezone.utc)
+    util_dt.parse_datetime = dt.datetime.fromisoformat
+    util = sys.modules["homeassistant.util"]
+    util.dt = util_dt
+    util.slugify = lambda text: "".join(c if c.isalnum() else "_" for c in text.lower())
+
+    class Entity:
+        hass = None
+        entity_id = None
+        _attr_extra_state_attributes = None
+
+        @property
+        def _on_remove(self) -> list:
+            return self.__dict__.setdefault("_on_remove_list", [])
+
+        def async_on_remove(self, func) -> None:
+            self._on_remove.append(func)
+
+        async def async_added_to_hass(self) -> None:
+            pass
+
+        async def async_will_remove_from_hass(self) -> None:
+            pass
+
+        @property
+        def state(self):
+            return None
+
+        @property
+        def extra_state_attributes(self):
+            return self._attr_extra_state_attributes
+
+        def async_write_ha_state(self) -> None:
+            # Like Home Assistant: evaluating state and attributes is the cost of a write
+            COUNTERS.states_written += 1
+            self._last_written = (self.state, self.extra_state_attributes)
+
+    _module("homeassistant.helpers.entity").Entity = Entity
+
+    for platform, class_name, value in (
+        ("sensor", "SensorEntity", "native_value"),
+        ("binary_sensor", "BinarySensorEntity", "is_on"),
+        ("number", "NumberEntity", "native_value"),
+        ("text", "TextEntity", "native_value"),
+        ("select", "SelectEntity", "current_option"),
+        ("date", "DateEntity", "native_value"),
+        ("button", "ButtonEntity", "name"),
+    ):
+        state = property(lambda self, value=value: getattr(self, value, None))
+        setattr(_module(f"homeassistant.components.{platform}"), class_name, type(class_name, (Entity,), {"state": state}))
+
+    recorder = _module("homeassistant.components.recorder")
+    recorder.get_instance = lambda hass: types.SimpleNamespace(async_clear_statistics=lambda ids: None)
+    models = _module("homeassistant.components.recorder.models")
+    models.StatisticData = models.StatisticMetaData = dict
+    _module("homeassistant.components.recorder.statistics").async_add_external_statistics = (
+        lambda hass, metadata, rows: None
+    )
+
+    _module("homeassistant.config_entries").ConfigEntry = object
+    sys.modules["homeassistant"].config_entries = sys.modules["homeassistant.config_entries"]
+
+    return HomeAssistant
+
+
+class ConfigEntry:
+    def __init__(self, car_id: str, name: str, tank_capacity_l: float | None = None) -> None:
+        self.entry_id = f"entry_{car_id}"
+        self.data = {"car_id": car_id, "name": name, "tank_capacity_l": tank_capacity_l}
+        self.version = 2
+        self.options: dict = {}
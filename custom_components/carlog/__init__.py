@@ -1,16 +1,61 @@
 from __future__ import annotations
 
 import datetime as dt
+from collections.abc import Callable, Iterable
+
+import voluptuous as vol
 
 from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant, ServiceCall
-from homeassistant.helpers.dispatcher import async_dispatcher_send
-from homeassistant.helpers.storage import Store
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect, async_dispatcher_send
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.entity import Entity
 from homeassistant.util import dt as dt_util
 
-from .const import DOMAIN, STORAGE_KEY, STORAGE_VERSION, DEFAULT_MAINTENANCE_TYPES
-
-SIGNAL_UPDATED = f"{DOMAIN}_updated"
+from .const import (
+    DOMAIN,
+    CONF_SAVE_DELAY,
+    DEFAULT_SAVE_DELAY,
+    DEFAULT_MAINTENANCE_TYPES,
+    KIND_FUEL,
+    KIND_MAINTENANCE,
+    KIND_META,
+    KIND_UI,
+    KIND_RUNTIME,
+)
+from .events import (
+    OP_DELETE_FUEL,
+    OP_DELETE_MAINTENANCE,
+    OP_LOG_FUEL,
+    OP_LOG_MAINTENANCE,
+    OP_UPDATE_FUEL,
+    OP_UPDATE_MAINTENANCE,
+    apply_event,
+    event_applies,
+    event_kind,
+)
+from .exporter import async_export_history
+from .external_stats import StatisticsPublisher
+from .importer import async_import_history
+from .instrumentation import get_instrumentation
+from .query import async_get_costs, async_query_history
+from .repository import CarRepository
+from .scheduler import MaintenanceScheduler
+from .storage import CarLogStorage
+from .timestamps import now_us, to_iso, to_us
+
+CONFIG_SCHEMA = vol.Schema(
+    {
+        DOMAIN: vol.Schema(
+            {
+                vol.Optional(CONF_SAVE_DELAY, default=DEFAULT_SAVE_DELAY): vol.All(
+                    vol.Coerce(float), vol.Range(min=0)
+                ),
+            }
+        )
+    },
+    extra=vol.ALLOW_EXTRA,
+)
 
 PLATFORMS: list[Platform] = [
     Platform.SENSOR,
@@ -23,11 +68,6 @@ PLATFORMS: list[Platform] = [
 ]
 
 
-def _ensure_car(data: dict, car_id: str) -> dict:
-    cars = data.setdefault("cars", {})
-    return cars.setdefault(car_id, {"fuel": [], "maintenance": {}, "meta": {}, "ui": {}})
-
-
 def _ensure_ui_defaults(car: dict) -> None:
     ui = car.setdefault("ui", {})
     ui.setdefault("odometer_km", car.get("meta", {}).get("odometer_km"))
@@ -38,218 +78,425 @@ def _ensure_ui_defaults(car: dict) -> None:
     ui.setdefault("maint_date", None)  # "YYYY-MM-DD" or None
 
 
-def _find_by_ts(items: list[dict], ts: str) -> int | None:
-    for i, it in enumerate(items):
-        if it.get("ts") == ts:
-            return i
-    return None
-
-
-def set_runtime_status(hass: HomeAssistant, car_id: str, saving: bool, state: str, message: str | None = None) -> None:
-    """Runtime-only status for UI feedback (not persistent)."""
+def _entry_ts(value: str) -> int | None:
+    """Timestamp of the entry a service call refers to; None if it is not a timestamp."""
+    try:
+        return to_us(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _check_not_archived(car_id: str, repo: CarRepository, event: dict) -> None:
+    """Archived entries are final: refuse to add, move or change entries at or before the archive."""
+    until = repo.archived_until(event_kind(event))
+    timestamps = (event["ts"], event.get("changes", {}).get("ts", event["ts"]))
+    if until is not None and any(ts <= until for ts in timestamps):
+        raise HomeAssistantError(f"History of {car_id} up to {to_iso(until)} is archived and can no longer be changed")
+
+
+def _date_ts(date_str: str) -> tuple[int, bool]:
+    """Timestamp of noon (local time) on a YYYY-MM-DD date, and whether that is not in the past."""
+    now_utc = dt_util.utcnow()
+    local_tz = dt_util.as_local(now_utc).tzinfo
+    y, m, d = [int(x) for x in date_str.split("-")]
+    ts_dt_utc = dt.datetime(y, m, d, 12, 0, 0, tzinfo=local_tz).astimezone(dt.timezone.utc)
+    return to_us(ts_dt_utc), ts_dt_utc >= now_utc
+
+
+def fuel_event(km: float, liters: float, price_total: float | None) -> dict:
+    """History event of a fill-up logged now."""
+    return {
+        "op": OP_LOG_FUEL,
+        "ts": now_us(),
+        "odometer_km": km,
+        "liters": liters,
+        "price_total": price_total,
+    }
+
+
+def maintenance_event(maint_type: str, km: float, note: str = "", date_str: str | None = None) -> dict:
+    """History event of maintenance done now, or at noon on date_str (YYYY-MM-DD)."""
+    ts, update_odometer = _date_ts(date_str) if date_str else (now_us(), True)
+    return {
+        "op": OP_LOG_MAINTENANCE,
+        "type": maint_type,
+        "ts": ts,
+        "odometer_km": km,
+        "note": note,
+        "update_odometer": update_odometer,
+    }
+
+
+def signal_car_updated(car_id: str, kind: str) -> str:
+    return f"{DOMAIN}_{car_id}_{kind}_updated"
+
+
+@callback
+def async_notify(hass: HomeAssistant, car_id: str, *kinds: str) -> None:
+    """Tell the entities of one car which kinds of its data changed."""
+    if any(kind not in (KIND_UI, KIND_RUNTIME) for kind in kinds):
+        # Invalidate derived values before any entity reads them
+        get_repository(hass, car_id).bump()
+    if KIND_MAINTENANCE in kinds or KIND_META in kinds:
+        scheduler = hass.data[DOMAIN].get("scheduler")
+        if scheduler is not None:
+            scheduler.async_reschedule(car_id)
+    if KIND_FUEL in kinds:
+        publisher = hass.data[DOMAIN].get("statistics")
+        if publisher is not None:
+            publisher.async_sync(car_id)
+    instrumentation = get_instrumentation(hass)
+    for kind in kinds:
+        instrumentation.dispatched(car_id, kind)
+        async_dispatcher_send(hass, signal_car_updated(car_id, kind), kinds)
+
+
+@callback
+def async_connect_car(
+    hass: HomeAssistant, car_id: str, kinds: Iterable[str], target: Callable[[], None]
+) -> Callable[[], None]:
+    """Call target once per notification of car_id touching any of kinds."""
+    kinds = tuple(kinds)
+    instrumentation = get_instrumentation(hass)
+
+    def _listener(kind: str) -> Callable[[tuple[str, ...]], None]:
+        @callback
+        def _handle(changed: tuple[str, ...]) -> None:
+            # A change spanning several subscribed kinds only wakes us once
+            if next(k for k in changed if k in kinds) == kind:
+                target()
+
+        return _handle
+
+    unsubs = [
+        async_dispatcher_connect(hass, signal_car_updated(car_id, kind), _listener(kind))
+        for kind in kinds
+    ]
+    for kind in kinds:
+        instrumentation.connected(car_id, kind, 1)
+
+    def _unsub() -> None:
+        for unsub in unsubs:
+            unsub()
+        for kind in kinds:
+            instrumentation.connected(car_id, kind, -1)
+
+    return _unsub
+
+
+@callback
+def async_write_if_changed(entity: Entity) -> None:
+    """Write the entity's state unless state and attributes equal the last write."""
+    with get_instrumentation(entity.hass).timed(getattr(entity, "car_id", None), "entity.state"):
+        written = (entity.state, entity.extra_state_attributes)
+    if written == entity._last_written:
+        return
+    entity._last_written = written
+    entity.async_write_ha_state()
+
+
+def get_repository(hass: HomeAssistant, car_id: str) -> CarRepository:
+    """Indexed fuel and maintenance history of a car."""
+    return hass.data[DOMAIN]["storage"].repository(car_id)
+
+
+def _set_runtime(hass: HomeAssistant, car_id: str, saving: bool, state: str, message: str | None = None) -> None:
     rt = hass.data.setdefault(DOMAIN, {}).setdefault("runtime", {})
     car_rt = rt.setdefault(car_id, {})
     car_rt["saving"] = saving
     car_rt["state"] = state  # idle/saving/saved/error
     car_rt["message"] = message or ""
     car_rt["ts"] = dt.datetime.now(dt.timezone.utc).isoformat()
-    async_dispatcher_send(hass, SIGNAL_UPDATED)
+
+
+def set_runtime_status(hass: HomeAssistant, car_id: str, saving: bool, state: str, message: str | None = None) -> None:
+    """Runtime-only status for UI feedback (not persistent)."""
+    _set_runtime(hass, car_id, saving, state, message)
+    async_notify(hass, car_id, KIND_RUNTIME)
+
+
+class CarTransaction:
+    """The changes of one action on a car: history events, draft values and runtime status.
+
+    Changes are collected in the ``async with`` block and nothing is applied
+    until it ends. Then the events are appended to the journal in a single
+    write and, only when that succeeded, applied together with the drafts
+    and the status, followed by one notification for all changed kinds. A
+    failed write (HomeAssistantError) or an exception in the block leaves
+    the car as it was, so there is nothing to roll back in memory.
+
+    The drafts travel in the journal with the last event, so that append is
+    the only write of the action: the car state follows with the next flush
+    and a replay restores the drafts should it never come.
+    """
+
+    def __init__(self, hass: HomeAssistant, car_id: str) -> None:
+        self.hass = hass
+        self.car_id = car_id
+        self._events: list[dict] = []
+        self._ui: dict = {}
+        self._status: tuple[bool, str, str | None] | None = None
+        self.kinds: list[str] = []
+
+    async def __aenter__(self) -> CarTransaction:
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            await self.async_commit()
+
+    def add_event(self, event: dict) -> None:
+        self._events.append(event)
+
+    def set_ui(self, **values) -> None:
+        self._ui.update(values)
+
+    def set_status(self, saving: bool, state: str, message: str | None = None) -> None:
+        self._status = (saving, state, message)
+
+    async def async_commit(self) -> None:
+        storage = self.hass.data[DOMAIN]["storage"]
+        car = await storage.async_get_car(self.car_id, history=bool(self._events))
+        with get_instrumentation(self.hass).timed(self.car_id, "transaction.commit"):
+            await self._async_write_and_apply(storage, car)
+        if self.kinds:
+            async_notify(self.hass, self.car_id, *self.kinds)
+
+    async def _async_write_and_apply(self, storage: CarLogStorage, car: dict) -> None:
+        async with storage.transaction_lock(self.car_id):
+            repo = get_repository(self.hass, self.car_id)
+            events = []
+            for event in self._events:
+                _check_not_archived(self.car_id, repo, event)
+                if event_applies(repo, event):
+                    events.append(event)
+            if events and self._ui:
+                events[-1]["ui"] = dict(self._ui)
+            if events:
+                try:
+                    await storage.async_append_events(self.car_id, events)
+                except OSError as err:
+                    raise HomeAssistantError(f"Could not save the history of {self.car_id}: {err}") from err
+
+            kinds: list[str] = []
+            for event in events:
+                kinds += apply_event(car, repo, event)
+            if events:
+                car["journal_seq"] = events[-1]["seq"]
+            if self._ui and not events:
+                car.setdefault("ui", {}).update(self._ui)
+                kinds.append(KIND_UI)
+            if KIND_UI in kinds:
+                storage.async_schedule_ui_save(self.car_id, journaled=bool(events))
+            if self._status is not None:
+                _set_runtime(self.hass, self.car_id, *self._status)
+                kinds.append(KIND_RUNTIME)
+            self.kinds = list(dict.fromkeys(kinds))
+
+
+async def _async_get_storage(hass: HomeAssistant, delay: float = DEFAULT_SAVE_DELAY) -> CarLogStorage:
+    """The shared storage, created and loaded once by whichever setup path runs first."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    storage = domain_data.get("storage")
+    if storage is None:
+        storage = domain_data["storage"] = CarLogStorage(hass, delay)
+    domain_data["data"] = await storage.async_load()
+    domain_data.setdefault("runtime", {})
+    return storage
 
 
 async def async_setup(hass: HomeAssistant, config: dict) -> bool:
-    hass.data.setdefault(DOMAIN, {})
-    store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
-    hass.data[DOMAIN]["store"] = store
-    hass.data[DOMAIN]["data"] = await store.async_load() or {"cars": {}}
-    hass.data[DOMAIN].setdefault("runtime", {})
+    delay = config.get(DOMAIN, {}).get(CONF_SAVE_DELAY, DEFAULT_SAVE_DELAY)
+    storage = await _async_get_storage(hass, delay)
+    hass.data[DOMAIN]["scheduler"] = MaintenanceScheduler(hass)
+    hass.data[DOMAIN]["statistics"] = StatisticsPublisher(hass)
 
-    async def _save() -> None:
-        await store.async_save(hass.data[DOMAIN]["data"])
-        async_dispatcher_send(hass, SIGNAL_UPDATED)
+    async def _commit(car_id: str, event: dict) -> None:
+        async with CarTransaction(hass, car_id) as transaction:
+            transaction.add_event(event)
 
     async def handle_log_fuel(call: ServiceCall) -> None:
         car_id = call.data["car_id"]
-        km = float(call.data["odometer_km"])
-        liters = float(call.data["liters"])
         price_total = call.data.get("price_total")
-        ts = dt.datetime.now(dt.timezone.utc).isoformat()
 
-        car = _ensure_car(hass.data[DOMAIN]["data"], car_id)
+        car = await storage.async_get_car(car_id)
         _ensure_ui_defaults(car)
 
-        car["fuel"].append(
-            {
-                "ts": ts,
-                "odometer_km": km,
-                "liters": liters,
-                "price_total": float(price_total) if price_total is not None else None,
-            }
+        await _commit(
+            car_id,
+            fuel_event(
+                float(call.data["odometer_km"]),
+                float(call.data["liters"]),
+                float(price_total) if price_total is not None else None,
+            ),
         )
 
-        car.setdefault("meta", {})["odometer_km"] = km
-        car.setdefault("ui", {})["odometer_km"] = km
-
-        await _save()
-
     async def handle_log_maintenance(call: ServiceCall) -> None:
         car_id = call.data["car_id"]
-        maint_type = call.data["type"]
-        km = float(call.data["odometer_km"])
-        note = call.data.get("note", "")
-        date_str = call.data.get("date")  # optional YYYY-MM-DD
-
-        now_utc = dt_util.utcnow()
 
-        if date_str:
-            local_tz = dt_util.as_local(now_utc).tzinfo
-            y, m, d = [int(x) for x in date_str.split("-")]
-            local_dt = dt.datetime(y, m, d, 12, 0, 0, tzinfo=local_tz)
-            ts_dt_utc = local_dt.astimezone(dt.timezone.utc)
-            ts = ts_dt_utc.isoformat()
-            update_odometer = ts_dt_utc >= now_utc
-        else:
-            ts = dt.datetime.now(dt.timezone.utc).isoformat()
-            update_odometer = True
-
-        car = _ensure_car(hass.data[DOMAIN]["data"], car_id)
+        car = await storage.async_get_car(car_id)
         _ensure_ui_defaults(car)
 
-        mt = car.setdefault("maintenance", {}).setdefault(maint_type, [])
-        mt.append({"ts": ts, "odometer_km": km, "note": note})
-
-        if update_odometer:
-            car.setdefault("meta", {})["odometer_km"] = km
-            car.setdefault("ui", {})["odometer_km"] = km
-
-        await _save()
+        await _commit(
+            car_id,
+            maintenance_event(
+                call.data["type"],
+                float(call.data["odometer_km"]),
+                call.data.get("note", ""),
+                call.data.get("date"),  # optional YYYY-MM-DD
+            ),
+        )
 
     async def handle_delete_fuel_entry(call: ServiceCall) -> None:
         car_id = call.data["car_id"]
         ts = call.data.get("ts")
 
-        car = _ensure_car(hass.data[DOMAIN]["data"], car_id)
-        fuel = car.get("fuel", [])
-        if not fuel:
+        await storage.async_get_car(car_id)
+        latest = get_repository(hass, car_id).fuel.latest()
+        if latest is None:
             return
 
-        if ts:
-            idx = _find_by_ts(fuel, ts)
-            if idx is None:
-                return
-            fuel.pop(idx)
-        else:
-            fuel.sort(key=lambda x: x.get("ts", ""))
-            fuel.pop(-1)
+        ts = _entry_ts(ts) if ts else latest["ts"]
+        if ts is None:
+            return
 
-        await _save()
+        await _commit(car_id, {"op": OP_DELETE_FUEL, "ts": ts})
 
     async def handle_update_fuel_entry(call: ServiceCall) -> None:
         car_id = call.data["car_id"]
-        ts = call.data["ts"]
-
-        car = _ensure_car(hass.data[DOMAIN]["data"], car_id)
-        fuel = car.get("fuel", [])
-
-        idx = _find_by_ts(fuel, ts)
-        if idx is None:
+        ts = _entry_ts(call.data["ts"])
+        if ts is None:
             return
 
-        entry = fuel[idx]
+        changes = {}
 
         if call.data.get("odometer_km") is not None:
-            entry["odometer_km"] = float(call.data["odometer_km"])
-            car.setdefault("meta", {})["odometer_km"] = entry["odometer_km"]
-            car.setdefault("ui", {})["odometer_km"] = entry["odometer_km"]
+            changes["odometer_km"] = float(call.data["odometer_km"])
 
         if call.data.get("liters") is not None:
-            entry["liters"] = float(call.data["liters"])
+            changes["liters"] = float(call.data["liters"])
 
         if "price_total" in call.data:
             pt = call.data.get("price_total")
-            entry["price_total"] = float(pt) if pt is not None else None
+            changes["price_total"] = float(pt) if pt is not None else None
 
-        await _save()
+        await _commit(car_id, {"op": OP_UPDATE_FUEL, "ts": ts, "changes": changes})
 
     async def handle_delete_maintenance_entry(call: ServiceCall) -> None:
         car_id = call.data["car_id"]
         maint_type = call.data["type"]
         ts = call.data.get("ts")
 
-        car = _ensure_car(hass.data[DOMAIN]["data"], car_id)
-        mt = car.setdefault("maintenance", {}).setdefault(maint_type, [])
-        if not mt:
+        await storage.async_get_car(car_id)
+        latest = get_repository(hass, car_id).maintenance(maint_type).latest()
+        if latest is None:
             return
 
-        if ts:
-            idx = _find_by_ts(mt, ts)
-            if idx is None:
-                return
-            mt.pop(idx)
-        else:
-            mt.sort(key=lambda x: x.get("ts", ""))
-            mt.pop(-1)
+        ts = _entry_ts(ts) if ts else latest["ts"]
+        if ts is None:
+            return
 
-        await _save()
+        await _commit(car_id, {"op": OP_DELETE_MAINTENANCE, "type": maint_type, "ts": ts})
 
     async def handle_update_maintenance_entry(call: ServiceCall) -> None:
         car_id = call.data["car_id"]
         maint_type = call.data["type"]
-        ts = call.data["ts"]
-
-        car = _ensure_car(hass.data[DOMAIN]["data"], car_id)
-        mt = car.setdefault("maintenance", {}).setdefault(maint_type, [])
-
-        idx = _find_by_ts(mt, ts)
-        if idx is None:
+        ts = _entry_ts(call.data["ts"])
+        if ts is None:
             return
 
-        entry = mt[idx]
-
-        now_utc = dt_util.utcnow()
+        changes = {}
         update_odometer = True
 
         date_str = call.data.get("date")
         if date_str:
-            local_tz = dt_util.as_local(now_utc).tzinfo
-            y, m, d = [int(x) for x in date_str.split("-")]
-            local_dt = dt.datetime(y, m, d, 12, 0, 0, tzinfo=local_tz)
-            ts_dt_utc = local_dt.astimezone(dt.timezone.utc)
-            entry["ts"] = ts_dt_utc.isoformat()
-            update_odometer = ts_dt_utc >= now_utc
+            changes["ts"], update_odometer = _date_ts(date_str)
 
         if call.data.get("odometer_km") is not None:
-            entry["odometer_km"] = float(call.data["odometer_km"])
-            if update_odometer:
-                car.setdefault("meta", {})["odometer_km"] = entry["odometer_km"]
-                car.setdefault("ui", {})["odometer_km"] = entry["odometer_km"]
+            changes["odometer_km"] = float(call.data["odometer_km"])
 
         if "note" in call.data:
-            entry["note"] = call.data.get("note", "")
+            changes["note"] = call.data.get("note", "")
+
+        await _commit(
+            car_id,
+            {
+                "op": OP_UPDATE_MAINTENANCE,
+                "type": maint_type,
+                "ts": ts,
+                "changes": changes,
+                "update_odometer": update_odometer,
+            },
+        )
 
-        await _save()
+    async def handle_import_history(call: ServiceCall) -> ServiceResponse:
+        response, changed = await async_import_history(hass, call)
+        for car_id, kinds in changed.items():
+            async_notify(hass, car_id, *kinds)
+        return response
+
+    async def handle_export_history(call: ServiceCall) -> ServiceResponse:
+        return await async_export_history(hass, call)
+
+    async def handle_get_due_soon(call: ServiceCall) -> ServiceResponse:
+        days = call.data.get("days", 30)
+        km = call.data.get("km", 1000)
+        until = dt_util.utcnow() + dt.timedelta(days=float(days)) if days is not None else None
+        items = hass.data[DOMAIN]["scheduler"].due_index.due_soon(
+            until, float(km) if km is not None else None, int(call.data.get("limit", 10))
+        )
+        return {"items": items}
+
+    async def handle_get_costs(call: ServiceCall) -> ServiceResponse:
+        return await async_get_costs(hass, call)
+
+    async def handle_query_fuel(call: ServiceCall) -> ServiceResponse:
+        return await async_query_history(hass, call, KIND_FUEL)
+
+    async def handle_query_maintenance(call: ServiceCall) -> ServiceResponse:
+        return await async_query_history(hass, call, KIND_MAINTENANCE)
+
+    instrumentation = get_instrumentation(hass)
+
+    def _register(service: str, handler, supports_response=SupportsResponse.NONE) -> None:
+        async def _timed_handler(call: ServiceCall) -> ServiceResponse:
+            car_id = call.data.get("car_id")
+            with instrumentation.timed(car_id if isinstance(car_id, str) else None, f"service.{service}"):
+                return await handler(call)
 
-    hass.services.async_register(DOMAIN, "log_fuel", handle_log_fuel)
-    hass.services.async_register(DOMAIN, "log_maintenance", handle_log_maintenance)
-    hass.services.async_register(DOMAIN, "delete_fuel_entry", handle_delete_fuel_entry)
-    hass.services.async_register(DOMAIN, "update_fuel_entry", handle_update_fuel_entry)
-    hass.services.async_register(DOMAIN, "delete_maintenance_entry", handle_delete_maintenance_entry)
-    hass.services.async_register(DOMAIN, "update_maintenance_entry", handle_update_maintenance_entry)
+        hass.services.async_register(DOMAIN, service, _timed_handler, supports_response=supports_response)
+
+    _register("log_fuel", handle_log_fuel)
+    _register("log_maintenance", handle_log_maintenance)
+    _register("delete_fuel_entry", handle_delete_fuel_entry)
+    _register("update_fuel_entry", handle_update_fuel_entry)
+    _register("delete_maintenance_entry", handle_delete_maintenance_entry)
+    _register("update_maintenance_entry", handle_update_maintenance_entry)
+    _register("import_history", handle_import_history, SupportsResponse.OPTIONAL)
+    _register("export_history", handle_export_history, SupportsResponse.OPTIONAL)
+    _register("get_due_soon", handle_get_due_soon, SupportsResponse.ONLY)
+    _register("get_costs", handle_get_costs, SupportsResponse.ONLY)
+    _register("query_fuel", handle_query_fuel, SupportsResponse.ONLY)
+    _register("query_maintenance", handle_query_maintenance, SupportsResponse.ONLY)
 
     return True
 
 
 async def async_setup_entry(hass: HomeAssistant, entry) -> bool:
-    hass.data.setdefault(DOMAIN, {})
-    if "store" not in hass.data[DOMAIN]:
-        hass.data[DOMAIN]["store"] = Store(hass, STORAGE_VERSION, STORAGE_KEY)
-        hass.data[DOMAIN]["data"] = await hass.data[DOMAIN]["store"].async_load() or {"cars": {}}
-    hass.data[DOMAIN].setdefault("runtime", {})
+    with get_instrumentation(hass).timed(entry.data["car_id"], "setup_entry"):
+        return await _async_setup_entry(hass, entry)
+
+
+async def _async_setup_entry(hass: HomeAssistant, entry) -> bool:
+    storage = await _async_get_storage(hass)
 
     car_id = entry.data["car_id"]
     name = entry.data["name"]
 
-    car = _ensure_car(hass.data[DOMAIN]["data"], car_id)
-    meta = car.setdefault("meta", {})
+    # The summary is enough for the entities; the history is loaded on first use
+    car = await storage.async_get_car(car_id, history=False)
+    meta = dict(car.get("meta", {}))
+    ui_before = dict(car.get("ui", {}))
     meta["name"] = name
     meta.setdefault("maintenance_defaults", DEFAULT_MAINTENANCE_TYPES)
 
@@ -259,8 +506,20 @@ async def async_setup_entry(hass: HomeAssistant, entry) -> bool:
     else:
         meta.setdefault("tank_capacity_l", None)
 
+    if meta != car.get("meta"):
+        # Writing the meta rewrites the shard, which needs the full history
+        car = await storage.async_get_car(car_id)
+        car["meta"] = meta
+        storage.async_schedule_save(car_id)
+
     _ensure_ui_defaults(car)
 
+    if "scheduler" in hass.data[DOMAIN]:
+        hass.data[DOMAIN]["scheduler"].async_reschedule(car_id)
+    if "statistics" in hass.data[DOMAIN]:
+        # Backfills the long-term statistics the first time a car is set up
+        hass.data[DOMAIN]["statistics"].async_sync(car_id)
+
     # runtime defaults
     rt = hass.data[DOMAIN]["runtime"].setdefault(car_id, {})
     rt.setdefault("saving", False)
@@ -268,25 +527,27 @@ async def async_setup_entry(hass: HomeAssistant, entry) -> bool:
     rt.setdefault("message", "")
     rt.setdefault("ts", None)
 
-    await hass.data[DOMAIN]["store"].async_save(hass.data[DOMAIN]["data"])
+    # Defaults are applied in memory; only a real change is written, and not
+    # before Home Assistant has started (see CarLogStorage._async_started)
+    if car["ui"] != ui_before:
+        storage.async_schedule_ui_save(car_id)
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
     return True
 
 
 async def async_unload_entry(hass: HomeAssistant, entry) -> bool:
-    return await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    unloaded = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    if "scheduler" in hass.data[DOMAIN]:
+        hass.data[DOMAIN]["scheduler"].async_remove_car(entry.data["car_id"])
+    await hass.data[DOMAIN]["storage"].async_flush()
+    return unloaded
 
 
 async def async_migrate_entry(hass: HomeAssistant, entry) -> bool:
     """Migrate old config entries to new versions (backwards compatible)."""
-    hass.data.setdefault(DOMAIN, {})
-
-    # Ensure store/data are available during migration
-    if "store" not in hass.data[DOMAIN]:
-        hass.data[DOMAIN]["store"] = Store(hass, STORAGE_VERSION, STORAGE_KEY)
-        hass.data[DOMAIN]["data"] = await hass.data[DOMAIN]["store"].async_load() or {"cars": {}}
-    hass.data[DOMAIN].setdefault("runtime", {})
+    # Same storage as the rest of the setup, so the store is loaded only once
+    storage = await _async_get_storage(hass)
 
     current_version = entry.version or 1
 
@@ -296,7 +557,7 @@ async def async_migrate_entry(hass: HomeAssistant, entry) -> bool:
         car_id = entry.data.get("car_id")
         tank_from_storage = None
         if car_id:
-            car = hass.data[DOMAIN]["data"].get("cars", {}).get(car_id, {})
+            car = await storage.async_get_car(car_id, history=False)
             tank_from_storage = car.get("meta", {}).get("tank_capacity_l")
 
         if "tank_capacity_l" not in new_data and tank_from_storage is not None:
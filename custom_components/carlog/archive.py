@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+import json
+import math
+import mmap
+import os
+import struct
+from collections.abc import Callable, Iterator
+
+from .columns import FuelLog
+from .stats import FuelBucket
+from .timestamps import local_time_zone, month_of, to_us
+
+# Fixed-width records, little endian, each starting with the epoch µs timestamp:
+# fuel: ts, odometer_km, liters, price_total (NaN: no price)
+FUEL_RECORD = struct.Struct("<qddd")
+# maintenance: ts, odometer_km, index of the type in the side file
+MAINTENANCE_RECORD = struct.Struct("<qdI4x")
+_TS = struct.Struct("<q")
+
+_FUEL_FIELDS = ("ts", "odometer_km", "liters", "price_total")
+_MAINTENANCE_FIELDS = ("ts", "odometer_km", "type")
+
+
+class ArchiveLog:
+    """Append-only file of fixed-width records sorted by timestamp.
+
+    The file is memory-mapped: entries are decoded on access and found by a
+    binary search on the leading timestamp of the records. Entries archived
+    since the last write wait in ``pending`` and are read from there until
+    they are on disk. Offers the read side of EventLog, so queries can scan
+    it the same way.
+    """
+
+    def __init__(self, path: str, record: struct.Struct, decode: Callable[[int, tuple], dict]) -> None:
+        self.path = path
+        self.record = record
+        self._decode = decode
+        self._map: mmap.mmap | None = None
+        self._mapped = 0
+        self.pending: list[dict] = []
+
+    def __len__(self) -> int:
+        return self._mapped + len(self.pending)
+
+    def __iter__(self) -> Iterator[dict]:
+        return (self[idx] for idx in range(len(self)))
+
+    def __getitem__(self, idx: int) -> dict:
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(idx)
+        if idx < self._mapped:
+            return self._decode(idx, self.record.unpack_from(self._map, idx * self.record.size))
+        return dict(self.pending[idx - self._mapped])
+
+    def _ts(self, idx: int) -> int:
+        if idx < self._mapped:
+            return _TS.unpack_from(self._map, idx * self.record.size)[0]
+        return self.pending[idx - self._mapped]["ts"]
+
+    def latest(self) -> dict | None:
+        return self[-1] if len(self) else None
+
+    def last_ts(self) -> int | None:
+        return self._ts(len(self) - 1) if len(self) else None
+
+    def position(self, ts: int | str) -> int:
+        """Index of the first entry at or after ts."""
+        key = to_us(ts)
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._ts(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def between(self, start: int | str | None = None, end: int | str | None = None) -> list[dict]:
+        """Entries with start <= ts < end; either bound may be omitted."""
+        lo = self.position(start) if start is not None else 0
+        hi = self.position(end) if end is not None else len(self)
+        return [self[idx] for idx in range(lo, hi)]
+
+    def open(self, count: int) -> None:
+        """Map the first count records; anything after them was never confirmed."""
+        self.close()
+        self._mapped = 0
+        if count <= 0 or not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            self._mapped = min(count, size // self.record.size)
+            if self._mapped:
+                self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def append(self, encode: Callable[[dict], tuple]) -> tuple[mmap.mmap | None, int, int]:
+        """Write the pending entries; returns the new map, record count and bytes written.
+
+        Runs in the executor. The current map stays valid (and in use on
+        the event loop) until ``attach`` swaps in the new one.
+        """
+        raw = b"".join(self.record.pack(*encode(entry)) for entry in self.pending)
+        count = self._mapped + len(self.pending)
+        # Read and write: the file is mapped again once written
+        with open(os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644), "r+b") as file:
+            # Drop an unconfirmed tail left by an interrupted write
+            file.truncate(self._mapped * self.record.size)
+            file.seek(self._mapped * self.record.size)
+            file.write(raw)
+            file.flush()
+            os.fsync(file.fileno())
+            new_map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if count else None
+        return new_map, count, len(raw)
+
+    def attach(self, new_map: mmap.mmap | None, count: int) -> None:
+        old, self._map = self._map, new_map
+        del self.pending[: count - self._mapped]
+        self._mapped = count
+        if old is not None:
+            old.close()
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+class CarArchive:
+    """Cold tier of the history of one car.
+
+    Entries older than the retention of the car are moved here from the
+    shard, so they are no longer serialized on every save. Numbers go to one
+    fixed-width record file per kind; maintenance types, notes and other
+    extra fields, the record counts and the lifetime fuel sums of the
+    archived fill-ups go to a small JSON side file. The side file is written
+    after the records, so records beyond its counts are ignored.
+
+    Everything archived is older than what remains in the shard, so the
+    fuel sums here plus the pair to the oldest fill-up in the shard give the
+    lifetime aggregate. The monthly sums are keyed by local month: loaded in
+    another time zone than they were written in, they are summed again from
+    the records and the side file is rewritten with the next write.
+    """
+
+    def __init__(self, base: str) -> None:
+        self._side_path = f"{base}.archive.json"
+        self.fuel = ArchiveLog(f"{base}.fuel.archive", FUEL_RECORD, self._decode_fuel)
+        self.maintenance = ArchiveLog(f"{base}.maintenance.archive", MAINTENANCE_RECORD, self._decode_maintenance)
+        self.types: list[str] = []
+        self.fuel_total = FuelBucket()
+        self.fuel_months: dict[str, FuelBucket] = {}
+        self.maintenance_counts: dict[str, int] = {}
+        self._extra: dict[str, dict[int, dict]] = {"fuel": {}, "maintenance": {}}
+        self._side_stale = False
+
+    @property
+    def has_pending(self) -> bool:
+        return bool(self.fuel.pending or self.maintenance.pending or self._side_stale)
+
+    def _decode_fuel(self, idx: int, values: tuple) -> dict:
+        ts, km, liters, price = values
+        entry = {"ts": ts, "odometer_km": km, "liters": liters, "price_total": None if math.isnan(price) else price}
+        entry.update(self._extra["fuel"].get(idx, {}))
+        return entry
+
+    def _decode_maintenance(self, idx: int, values: tuple) -> dict:
+        ts, km, type_id = values
+        entry = {"ts": ts, "odometer_km": km, "type": self.types[type_id], "note": ""}
+        entry.update(self._extra["maintenance"].get(idx, {}))
+        return entry
+
+    @staticmethod
+    def _encode_fuel(entry: dict) -> tuple:
+        price = entry.get("price_total")
+        return (
+            entry["ts"],
+            float(entry.get("odometer_km", 0)),
+            float(entry.get("liters", 0)),
+            math.nan if price is None else float(price),
+        )
+
+    def _encode_maintenance(self, entry: dict) -> tuple:
+        return entry["ts"], float(entry.get("odometer_km", 0)), self.types.index(entry["type"])
+
+    def load(self) -> None:
+        """Read the side file and map the confirmed records. Runs in the executor."""
+        try:
+            with open(self._side_path, encoding="utf-8") as file:
+                side = json.load(file)
+        except FileNotFoundError:
+            return
+        self.types = side["types"]
+        self.fuel_total = FuelBucket.from_list(side["fuel"]["total"])
+        self.fuel_months = {month: FuelBucket.from_list(values) for month, values in side["fuel"]["months"].items()}
+        self.maintenance_counts = side["maintenance"]["counts"]
+        for kind in ("fuel", "maintenance"):
+            self._extra[kind] = {int(idx): extra for idx, extra in side[kind]["extra"].items()}
+        self.fuel.open(side["fuel"]["count"])
+        self.maintenance.open(side["maintenance"]["count"])
+        if side.get("time_zone") != local_time_zone():
+            self.fuel_total, self.fuel_months = FuelLog.from_entries(list(self.fuel)).aggregate()
+            self._side_stale = True
+
+    def add(self, fuel: list[dict], maintenance: list[dict]) -> None:
+        """Archive entries, all older than the rest of the history; written by ``write``.
+
+        Maintenance entries carry their "type". The fuel sums are updated
+        here, including the pair of the last fill-up archived before.
+        """
+        if fuel:
+            total, months = FuelLog.from_entries(fuel).aggregate()
+            anchor = self.fuel.latest()
+            if anchor is not None:
+                total.add_pair(anchor, fuel[0], 1)
+                months[month_of(fuel[0]["ts"])].add_pair(anchor, fuel[0], 1)
+            self.fuel_total.merge(total)
+            for month, bucket in months.items():
+                target = self.fuel_months.get(month)
+                if target is None:
+                    target = self.fuel_months[month] = FuelBucket()
+                target.merge(bucket)
+        self._add(self.fuel, "fuel", fuel, _FUEL_FIELDS)
+
+        for entry in maintenance:
+            if entry["type"] not in self.types:
+                self.types.append(entry["type"])
+            self.maintenance_counts[entry["type"]] = self.maintenance_counts.get(entry["type"], 0) + 1
+        self._add(self.maintenance, "maintenance", maintenance, _MAINTENANCE_FIELDS)
+
+    def _add(self, log: ArchiveLog, kind: str, entries: list[dict], fields: tuple[str, ...]) -> None:
+        for entry in entries:
+            extra = {key: value for key, value in entry.items() if key not in fields and value not in ("", None)}
+            if extra:
+                self._extra[kind][len(log)] = extra
+            log.pending.append(entry)
+
+    def write(self) -> tuple[tuple, int]:
+        """Append the pending records, then the side file. Runs in the executor.
+
+        Returns what ``attach`` needs and the bytes written.
+        """
+        fuel = self.fuel.append(self._encode_fuel)
+        maintenance = self.maintenance.append(self._encode_maintenance)
+        side = {
+            "time_zone": local_time_zone(),
+            "types": self.types,
+            "fuel": {
+                "count": fuel[1],
+                "total": self.fuel_total.to_list(),
+                "months": {month: bucket.to_list() for month, bucket in sorted(self.fuel_months.items())},
+                "extra": {str(idx): extra for idx, extra in self._extra["fuel"].items()},
+            },
+            "maintenance": {
+                "count": maintenance[1],
+                "counts": self.maintenance_counts,
+                "extra": {str(idx): extra for idx, extra in self._extra["maintenance"].items()},
+            },
+        }
+        raw = json.dumps(side, separators=(",", ":")).encode()
+        tmp = f"{self._side_path}.tmp"
+        with open(tmp, "wb") as file:
+            file.write(raw)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp, self._side_path)
+        self._side_stale = False
+        return (fuel[:2], maintenance[:2]), fuel[2] + maintenance[2] + len(raw)
+
+    def attach(self, maps: tuple) -> None:
+        """Switch the readers over to the written records, on the event loop."""
+        self.fuel.attach(*maps[0])
+        self.maintenance.attach(*maps[1])
+
+    def close(self) -> None:
+        self.fuel.close()
+        self.maintenance.close()
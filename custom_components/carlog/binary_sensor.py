@@ -3,21 +3,24 @@ from __future__ import annotations
 from homeassistant.components.binary_sensor import BinarySensorEntity
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.dispatcher import async_dispatcher_connect
 
-from .const import DOMAIN
-from .__init__ import SIGNAL_UPDATED
+from .const import DOMAIN, KIND_RUNTIME
+from .__init__ import async_connect_car, async_write_if_changed
 
 
 async def async_setup_entry(hass: HomeAssistant, entry, async_add_entities: AddEntitiesCallback) -> None:
     car_id = entry.data["car_id"]
     name = entry.data["name"]
-    async_add_entities([CarSavingBinarySensor(hass, car_id, name)], update_before_add=True)
+    async_add_entities([CarSavingBinarySensor(hass, car_id, name)])
 
 
 class CarSavingBinarySensor(BinarySensorEntity):
     _attr_has_entity_name = True
+    _attr_should_poll = False
     _attr_icon = "mdi:content-save"
+    _signal_kinds = (KIND_RUNTIME,)
+    _last_written: tuple | None = None
+    _unrecorded_attributes = frozenset({"state", "message", "ts"})
 
     def __init__(self, hass: HomeAssistant, car_id: str, car_name: str):
         self.hass = hass
@@ -49,11 +52,11 @@ class CarSavingBinarySensor(BinarySensorEntity):
         }
 
     async def async_added_to_hass(self) -> None:
-        self._unsub = async_dispatcher_connect(self.hass, SIGNAL_UPDATED, self._handle_update)
+        self._unsub = async_connect_car(self.hass, self.car_id, self._signal_kinds, self._handle_update)
 
     async def async_will_remove_from_hass(self) -> None:
         if self._unsub:
             self._unsub()
 
     def _handle_update(self) -> None:
-        self.async_write_ha_state()
+        async_write_if_changed(self)
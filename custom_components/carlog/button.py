@@ -5,7 +5,7 @@ from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from .const import DOMAIN
-from .__init__ import set_runtime_status
+from .__init__ import CarTransaction, fuel_event, get_repository, maintenance_event, set_runtime_status
 
 
 async def async_setup_entry(hass: HomeAssistant, entry, async_add_entities: AddEntitiesCallback) -> None:
@@ -16,12 +16,12 @@ async def async_setup_entry(hass: HomeAssistant, entry, async_add_entities: AddE
             CarLogFuelButton(hass, car_id, name),
             CarLogMaintButton(hass, car_id, name),
         ],
-        update_before_add=True,
     )
 
 
 class _BaseButton(ButtonEntity):
     _attr_has_entity_name = True
+    _attr_should_poll = False
 
     def __init__(self, hass: HomeAssistant, car_id: str, car_name: str, title: str, icon: str, uid_suffix: str):
         self.hass = hass
@@ -71,9 +71,8 @@ class CarLogFuelButton(_BaseButton):
             return
 
         # Check: km én liters moeten beide anders zijn dan vorige tankbeurt
-        fuel_logs = car.get("fuel", [])
-        if fuel_logs:
-            last = sorted(fuel_logs, key=lambda x: x.get("ts", ""))[-1]
+        last = get_repository(self.hass, self.car_id).fuel_stats.last
+        if last:
             try:
                 last_km = float(last.get("odometer_km", -1))
                 last_l = float(last.get("liters", -1))
@@ -90,24 +89,16 @@ class CarLogFuelButton(_BaseButton):
                 # Als parsing faalt: niet blokkeren
                 pass
 
-        set_runtime_status(self.hass, self.car_id, True, "saving", "Bezig met opslaan…")
-
-        data = {"car_id": self.car_id, "odometer_km": km_f, "liters": liters_f}
-        if price and float(price) > 0:
-            data["price_total"] = float(price)
+        price_f = float(price) if price and float(price) > 0 else None
 
+        # Tankbeurt, reset van de invoer en status: één schrijfactie, één update
         try:
-            await self.hass.services.async_call(DOMAIN, "log_fuel", data, blocking=True)
+            async with CarTransaction(self.hass, self.car_id) as transaction:
+                transaction.add_event(fuel_event(km_f, liters_f, price_f))
+                transaction.set_ui(liters=0.0, price_total=0.0)
+                transaction.set_status(False, "saved", "Opgeslagen ✅")
         except Exception as e:
             set_runtime_status(self.hass, self.car_id, False, "error", f"Opslaan mislukt: {e}")
-            return
-
-        # Reset invoer na succesvolle opslag
-        ui["liters"] = 0.0
-        ui["price_total"] = 0.0
-        await self.hass.data[DOMAIN]["store"].async_save(self.hass.data[DOMAIN]["data"])
-
-        set_runtime_status(self.hass, self.car_id, False, "saved", "Opgeslagen ✅")
 
 
 class CarLogMaintButton(_BaseButton):
@@ -133,21 +124,11 @@ class CarLogMaintButton(_BaseButton):
             set_runtime_status(self.hass, self.car_id, False, "error", "Ongeldige kilometerstand")
             return
 
-        set_runtime_status(self.hass, self.car_id, True, "saving", "Bezig met opslaan…")
-
-        data = {"car_id": self.car_id, "type": maint_type, "odometer_km": km_f, "note": note}
-        if date_str:
-            data["date"] = date_str
-
         try:
-            await self.hass.services.async_call(DOMAIN, "log_maintenance", data, blocking=True)
+            async with CarTransaction(self.hass, self.car_id) as transaction:
+                transaction.add_event(maintenance_event(maint_type, km_f, note, date_str))
+                # Reset notitie & datum, km/type laten staan
+                transaction.set_ui(note="", maint_date=None)
+                transaction.set_status(False, "saved", "Opgeslagen ✅")
         except Exception as e:
             set_runtime_status(self.hass, self.car_id, False, "error", f"Opslaan mislukt: {e}")
-            return
-
-        # Reset notitie & datum, km/type laten staan
-        ui["note"] = ""
-        ui["maint_date"] = None
-        await self.hass.data[DOMAIN]["store"].async_save(self.hass.data[DOMAIN]["data"])
-
-        set_runtime_status(self.hass, self.car_id, False, "saved", "Opgeslagen ✅")
@@ -0,0 +1,264 @@
+from __future__ import annotations
+
+import bisect
+import math
+from array import array
+from collections.abc import Iterator
+
+from .stats import FuelBucket
+from .timestamps import month_bounds, month_of, months_between, to_us
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy ships with Home Assistant
+    np = None
+
+_FIELDS = ("ts", "odometer_km", "liters", "price_total")
+
+
+class FuelLog:
+    """Timestamp-sorted fuel log stored as parallel typed arrays.
+
+    Holds the epoch timestamp in microseconds, odometer, liters and price
+    (NaN for no price) per fill-up instead of one dict each. Entries are
+    handed out as fresh dicts, so it can stand in for the EventLog of a fuel
+    list. The shard stores the same columns (see ``to_columns``). Fields other
+    than the four columns are kept aside per timestamp.
+    """
+
+    def __init__(self) -> None:
+        self.ts = array("q")
+        self.km = array("d")
+        self.liters = array("d")
+        self.price = array("d")
+        self._extra: dict[int, dict] = {}
+
+    @classmethod
+    def from_entries(cls, entries: list[dict]) -> FuelLog:
+        log = cls()
+        log.extend(entries)
+        return log
+
+    @classmethod
+    def from_columns(cls, columns: dict) -> FuelLog:
+        """Load the shard format; already sorted, so nothing is parsed or sorted."""
+        log = cls()
+        log.ts = array("q", columns.get("ts", []))
+        log.km = array("d", columns.get("odometer_km", []))
+        log.liters = array("d", columns.get("liters", []))
+        log.price = array("d", [math.nan if p is None else p for p in columns.get("price_total", [])])
+        log._extra = {int(key): extra for key, extra in columns.get("extra", {}).items()}
+        return log
+
+    def to_columns(self) -> dict:
+        columns = {
+            "ts": self.ts.tolist(),
+            "odometer_km": self.km.tolist(),
+            "liters": self.liters.tolist(),
+            "price_total": [None if math.isnan(p) else p for p in self.price],
+        }
+        if self._extra:
+            columns["extra"] = {str(key): extra for key, extra in self._extra.items()}
+        return columns
+
+    def to_entries(self) -> list[dict]:
+        return [self._entry(idx) for idx in range(len(self.ts))]
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def __iter__(self) -> Iterator[dict]:
+        return (self._entry(idx) for idx in range(len(self.ts)))
+
+    def __getitem__(self, idx: int) -> dict:
+        if idx < 0:
+            idx += len(self.ts)
+        if not 0 <= idx < len(self.ts):
+            raise IndexError(idx)
+        return self._entry(idx)
+
+    def _entry(self, idx: int) -> dict:
+        price = self.price[idx]
+        entry = {
+            "ts": self.ts[idx],
+            "odometer_km": self.km[idx],
+            "liters": self.liters[idx],
+            "price_total": None if math.isnan(price) else price,
+        }
+        extra = self._extra.get(self.ts[idx])
+        if extra:
+            entry.update(extra)
+        return entry
+
+    def latest(self) -> dict | None:
+        return self._entry(len(self.ts) - 1) if self.ts else None
+
+    def index_of(self, ts: int | str) -> int | None:
+        try:
+            key = to_us(ts)
+        except (TypeError, ValueError):
+            return None
+        idx = bisect.bisect_left(self.ts, key)
+        if idx < len(self.ts) and self.ts[idx] == key:
+            return idx
+        return None
+
+    def get(self, ts: int | str) -> dict | None:
+        idx = self.index_of(ts)
+        return self._entry(idx) if idx is not None else None
+
+    def position(self, ts: int | str) -> int:
+        """Index of the first entry at or after ts."""
+        return bisect.bisect_left(self.ts, to_us(ts))
+
+    def slice(self, lo: int, hi: int | None = None) -> list[dict]:
+        lo, hi, _ = slice(lo, hi).indices(len(self.ts))
+        return [self._entry(idx) for idx in range(lo, hi)]
+
+    def between(self, start: int | str | None = None, end: int | str | None = None) -> list[dict]:
+        """Entries with start <= ts < end; either bound may be omitted."""
+        lo = self.position(start) if start is not None else 0
+        hi = self.position(end) if end is not None else len(self.ts)
+        return self.slice(lo, hi)
+
+    def _values(self, entry: dict) -> tuple[int, float, float, float]:
+        price = entry.get("price_total")
+        extra = {k: v for k, v in entry.items() if k not in _FIELDS}
+        key = to_us(entry["ts"])
+        if extra:
+            self._extra[key] = extra
+        return (
+            key,
+            float(entry.get("odometer_km", 0)),
+            float(entry.get("liters", 0)),
+            math.nan if price is None else float(price),
+        )
+
+    def insert(self, entry: dict) -> int:
+        key, km, liters, price = self._values(entry)
+        idx = bisect.bisect_right(self.ts, key)
+        self.ts.insert(idx, key)
+        self.km.insert(idx, km)
+        self.liters.insert(idx, liters)
+        self.price.insert(idx, price)
+        return idx
+
+    def update(self, idx: int, changes: dict) -> int:
+        """Apply changes to the entry at idx and return its new position."""
+        if "ts" in changes and to_us(changes["ts"]) != self.ts[idx]:
+            entry = self.pop(idx)
+            entry.update(changes)
+            return self.insert(entry)
+        entry = self._entry(idx)
+        entry.update(changes)
+        _, self.km[idx], self.liters[idx], self.price[idx] = self._values(entry)
+        return idx
+
+    def pop(self, idx: int) -> dict:
+        entry = self._entry(idx)
+        key = self.ts.pop(idx)
+        del self.km[idx], self.liters[idx], self.price[idx]
+        if key in self._extra and key not in self.ts:
+            del self._extra[key]
+        return entry
+
+    def split_head(self, count: int) -> list[dict]:
+        """Remove and return the count oldest entries."""
+        head = self.slice(0, count)
+        if head:
+            del self.ts[:count], self.km[:count], self.liters[:count], self.price[:count]
+            for entry in head:
+                # Sorted: a remaining entry with the same ts can only be the first
+                if not self.ts or entry["ts"] != self.ts[0]:
+                    self._extra.pop(entry["ts"], None)
+        return head
+
+    def extend(self, entries: list[dict]) -> None:
+        """Add many entries at once with a single sort instead of one insert each."""
+        rows = list(zip(self.ts, self.km, self.liters, self.price))
+        rows += [self._values(entry) for entry in entries]
+        # Stable sort on ts keeps the existing order of equal timestamps
+        rows.sort(key=lambda row: row[0])
+        self.ts = array("q", [row[0] for row in rows])
+        self.km = array("d", [row[1] for row in rows])
+        self.liters = array("d", [row[2] for row in rows])
+        self.price = array("d", [row[3] for row in rows])
+
+    def aggregate(self) -> tuple[FuelBucket, dict[str, FuelBucket]]:
+        """Lifetime and per-month buckets, recomputed from the columns."""
+        if np is not None and len(self.ts) > 1:
+            return self._aggregate_numpy()
+        return self._aggregate_python()
+
+    def _aggregate_python(self) -> tuple[FuelBucket, dict[str, FuelBucket]]:
+        total = FuelBucket()
+        months: dict[str, FuelBucket] = {}
+        prev_km = None
+        for key, km, liters, price in zip(self.ts, self.km, self.liters, self.price):
+            month = month_of(key)
+            bucket = months.get(month)
+            if bucket is None:
+                bucket = months[month] = FuelBucket()
+            priced = not math.isnan(price)
+            for target in (total, bucket):
+                target.fills += 1
+                if priced:
+                    target.priced_fills += 1
+                    target.spend += price
+                    target.priced_liters += liters
+            if prev_km is not None and km - prev_km > 0:
+                for target in (total, bucket):
+                    target.km += km - prev_km
+                    target.liters += liters
+                    if priced:
+                        target.priced_km += km - prev_km
+                        target.priced_cost += price
+            prev_km = km
+        return total, months
+
+    def _aggregate_numpy(self) -> tuple[FuelBucket, dict[str, FuelBucket]]:
+        ts = np.frombuffer(self.ts, dtype=np.int64)
+        km = np.frombuffer(self.km, dtype=np.float64)
+        liters = np.frombuffer(self.liters, dtype=np.float64)
+        price = np.frombuffer(self.price, dtype=np.float64)
+
+        priced = ~np.isnan(price)
+        dk = np.diff(km)
+        pair = np.concatenate(([False], dk > 0))
+        pair_km = np.concatenate(([0.0], np.where(dk > 0, dk, 0.0)))
+        priced_pair = pair & priced
+
+        columns = {
+            "fills": np.ones(len(ts)),
+            "priced_fills": priced.astype(np.float64),
+            "spend": np.where(priced, price, 0.0),
+            "priced_liters": np.where(priced, liters, 0.0),
+            "km": pair_km,
+            "liters": np.where(pair, liters, 0.0),
+            "priced_km": np.where(priced_pair, pair_km, 0.0),
+            "priced_cost": np.where(priced_pair, price, 0.0),
+        }
+
+        # Months are local: find each fill-up's month by the month starts
+        labels = months_between(int(ts[0]), int(ts[-1]))
+        starts = np.array([month_bounds(label)[0] for label in labels], dtype=np.int64)
+        month_idx = np.searchsorted(starts, ts, side="right") - 1
+        sums = {
+            field: np.bincount(month_idx, weights=values, minlength=len(labels))
+            for field, values in columns.items()
+        }
+
+        total = FuelBucket()
+        for field, values in columns.items():
+            setattr(total, field, float(values.sum()))
+        months = {}
+        for pos, label in enumerate(labels):
+            if not sums["fills"][pos]:
+                continue
+            bucket = months[label] = FuelBucket()
+            for field, values in sums.items():
+                setattr(bucket, field, float(values[pos]))
+        for bucket in (total, *months.values()):
+            bucket.fills = int(bucket.fills)
+            bucket.priced_fills = int(bucket.priced_fills)
+        return total, months
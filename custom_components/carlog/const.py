@@ -1,6 +1,33 @@
 DOMAIN = "carlog"
 STORAGE_KEY = "carlog_data"
-STORAGE_VERSION = 1
+STORAGE_KEY_INDEX = "carlog_index"
+STORAGE_KEY_UI = "carlog_ui"
+# Version 2: epoch microsecond timestamps and fuel stored as columns
+STORAGE_VERSION = 2
+
+# Entries converted per step when migrating, before yielding to the loop
+MIGRATE_CHUNK_ENTRIES = 2000
+
+# Journal size after which it is folded into a new shard snapshot
+JOURNAL_MAX_ENTRIES = 500
+JOURNAL_MAX_BYTES = 256 * 1024
+
+# Seconds to coalesce mutations before they are written to storage
+CONF_SAVE_DELAY = "save_delay"
+DEFAULT_SAVE_DELAY = 5.0
+
+# Recent consumption: last N fill-ups and a trailing window in days
+FUEL_RECENT_FILLS = 5
+FUEL_WINDOW_DAYS = 90
+# Months of buckets shown in the attributes of the monthly sensor
+MONTHS_SHOWN = 12
+
+# Change kinds used to scope update signals per car
+KIND_FUEL = "fuel"
+KIND_MAINTENANCE = "maintenance"
+KIND_META = "meta"
+KIND_UI = "ui"
+KIND_RUNTIME = "runtime"
 
 DEFAULT_MAINTENANCE_TYPES = {
     "oil": {"label": "Olie", "interval_km": 15000, "interval_days": 365},
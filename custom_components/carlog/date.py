@@ -5,21 +5,23 @@ import datetime as dt
 from homeassistant.components.date import DateEntity
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.dispatcher import async_dispatcher_connect
 
-from .const import DOMAIN
-from .__init__ import SIGNAL_UPDATED
+from .const import DOMAIN, KIND_UI
+from .__init__ import async_connect_car, async_write_if_changed
 
 
 async def async_setup_entry(hass: HomeAssistant, entry, async_add_entities: AddEntitiesCallback) -> None:
     car_id = entry.data["car_id"]
     name = entry.data["name"]
-    async_add_entities([CarUiMaintDate(hass, car_id, name)], update_before_add=True)
+    async_add_entities([CarUiMaintDate(hass, car_id, name)])
 
 
 class CarUiMaintDate(DateEntity):
     _attr_has_entity_name = True
+    _attr_should_poll = False
     _attr_icon = "mdi:calendar"
+    _signal_kinds = (KIND_UI,)
+    _last_written: tuple | None = None
 
     def __init__(self, hass: HomeAssistant, car_id: str, car_name: str):
         self.hass = hass
@@ -50,15 +52,15 @@ class CarUiMaintDate(DateEntity):
     async def async_set_value(self, value) -> None:
         car = self._car()
         car.setdefault("ui", {})["maint_date"] = value.isoformat() if value else None
-        await self.hass.data[DOMAIN]["store"].async_save(self.hass.data[DOMAIN]["data"])
-        self.async_write_ha_state()
+        self.hass.data[DOMAIN]["storage"].async_schedule_ui_save(self.car_id)
+        async_write_if_changed(self)
 
     async def async_added_to_hass(self) -> None:
-        self._unsub = async_dispatcher_connect(self.hass, SIGNAL_UPDATED, self._handle_update)
+        self._unsub = async_connect_car(self.hass, self.car_id, self._signal_kinds, self._handle_update)
 
     async def async_will_remove_from_hass(self) -> None:
         if self._unsub:
             self._unsub()
 
     def _handle_update(self) -> None:
-        self.async_write_ha_state()
+        async_write_if_changed(self)
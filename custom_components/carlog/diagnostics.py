@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .instrumentation import get_instrumentation
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry) -> dict:
+    """History sizes and instrumentation of the car, plus the integration totals."""
+    car_id = entry.data["car_id"]
+    storage = hass.data[DOMAIN]["storage"]
+    car = await storage.async_get_car(car_id, history=False)
+    repo = storage.repository(car_id)
+    instrumentation = get_instrumentation(hass)
+    return {
+        "car": {
+            "car_id": car_id,
+            "name": car.get("meta", {}).get("name", car_id),
+            "history_loaded": storage.history_loaded(car_id),
+            "fuel_entries": repo.fuel_stats.count,
+            "maintenance_entries": {
+                maint_type: repo.maintenance_count(maint_type) for maint_type in repo.maintenance_types()
+            },
+            "archived_entries": repo.archived_counts(),
+            "revision": repo.revision,
+            "journal_seq": car.get("journal_seq", 0),
+        },
+        "instrumentation": instrumentation.as_dict(car_id),
+        "integration": {
+            "cars": len(storage.car_ids()),
+            "loaded_cars": len(hass.data[DOMAIN]["data"]["cars"]),
+            "loaded_histories": sum(map(storage.history_loaded, storage.car_ids())),
+            "instrumentation": instrumentation.as_dict(),
+        },
+    }
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+from .const import KIND_FUEL, KIND_MAINTENANCE, KIND_META, KIND_UI
+from .repository import CarRepository
+from .timestamps import to_us
+
+OP_LOG_FUEL = "log_fuel"
+OP_UPDATE_FUEL = "update_fuel"
+OP_DELETE_FUEL = "delete_fuel"
+OP_LOG_MAINTENANCE = "log_maintenance"
+OP_UPDATE_MAINTENANCE = "update_maintenance"
+OP_DELETE_MAINTENANCE = "delete_maintenance"
+
+
+_FUEL_OPS = (OP_LOG_FUEL, OP_UPDATE_FUEL, OP_DELETE_FUEL)
+
+
+def event_kind(event: dict) -> str:
+    """The history an event belongs to: KIND_FUEL or KIND_MAINTENANCE."""
+    return KIND_FUEL if event["op"] in _FUEL_OPS else KIND_MAINTENANCE
+
+
+def event_applies(repo: CarRepository, event: dict) -> bool:
+    """Whether apply_event would change anything: updates and deletes need their entry."""
+    op = event["op"]
+    if op in (OP_UPDATE_FUEL, OP_DELETE_FUEL):
+        return repo.fuel.index_of(event["ts"]) is not None
+    if op in (OP_UPDATE_MAINTENANCE, OP_DELETE_MAINTENANCE):
+        return repo.maintenance(event["type"]).index_of(event["ts"]) is not None
+    return True
+
+
+def _set_odometer(car: dict, km: float, kinds: list[str], replay: bool) -> None:
+    car.setdefault("meta", {})["odometer_km"] = km
+    kinds.append(KIND_META)
+    if not replay:
+        car.setdefault("ui", {})["odometer_km"] = km
+        kinds.append(KIND_UI)
+
+
+def apply_event(car: dict, repo: CarRepository, event: dict, replay: bool = False) -> list[str]:
+    """Apply one history event to a car and return the kinds that changed.
+
+    Used both by the service handlers and when replaying the journal, so an
+    event must carry everything needed to reproduce its effect, including
+    the draft values it changed ("ui"). On replay only the history and meta
+    change; the saved draft inputs already include the event.
+    """
+    op = event["op"]
+    kinds: list[str] = []
+    # Journals written before storage v2 carry ISO timestamps
+    event = {**event, "ts": to_us(event["ts"])}
+    if "ts" in event.get("changes", {}):
+        event["changes"] = {**event["changes"], "ts": to_us(event["changes"]["ts"])}
+
+    if op == OP_LOG_FUEL:
+        repo.add_fuel(
+            {
+                "ts": event["ts"],
+                "odometer_km": event["odometer_km"],
+                "liters": event["liters"],
+                "price_total": event["price_total"],
+            }
+        )
+        kinds.append(KIND_FUEL)
+        _set_odometer(car, event["odometer_km"], kinds, replay)
+
+    elif op == OP_UPDATE_FUEL:
+        changes = event["changes"]
+        if not repo.update_fuel(event["ts"], changes):
+            return kinds
+        kinds.append(KIND_FUEL)
+        if "odometer_km" in changes:
+            _set_odometer(car, changes["odometer_km"], kinds, replay)
+
+    elif op == OP_DELETE_FUEL:
+        if not repo.delete_fuel(event["ts"]):
+            return kinds
+        kinds.append(KIND_FUEL)
+
+    elif op == OP_LOG_MAINTENANCE:
+        repo.add_maintenance(
+            event["type"],
+            {"ts": event["ts"], "odometer_km": event["odometer_km"], "note": event["note"]},
+        )
+        kinds.append(KIND_MAINTENANCE)
+        if event["update_odometer"]:
+            _set_odometer(car, event["odometer_km"], kinds, replay)
+
+    elif op == OP_UPDATE_MAINTENANCE:
+        changes = event["changes"]
+        if not repo.update_maintenance(event["type"], event["ts"], changes):
+            return kinds
+        kinds.append(KIND_MAINTENANCE)
+        if "odometer_km" in changes and event["update_odometer"]:
+            _set_odometer(car, changes["odometer_km"], kinds, replay)
+
+    elif op == OP_DELETE_MAINTENANCE:
+        if not repo.delete_maintenance(event["type"], event["ts"]):
+            return kinds
+        kinds.append(KIND_MAINTENANCE)
+
+    if not replay and "ui" in event:
+        car.setdefault("ui", {}).update(event["ui"])
+        kinds.append(KIND_UI)
+
+    return kinds
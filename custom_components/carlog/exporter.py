@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import asyncio
+import csv
+import io
+import json
+import logging
+import os
+
+from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN, KIND_FUEL, KIND_MAINTENANCE
+from .timestamps import day_start_us, to_iso
+
+_LOGGER = logging.getLogger(__name__)
+
+# Same columns as accepted by import_history, so an export can be re-imported
+EXPORT_FIELDS = ["car_id", "kind", "ts", "odometer_km", "liters", "price_total", "type", "note"]
+EXPORT_CHUNK_ROWS = 1000
+
+
+def _encode_chunk(rows: list[dict], fmt: str, header: bool) -> bytes:
+    buf = io.StringIO()
+    if fmt == "csv":
+        writer = csv.DictWriter(buf, fieldnames=EXPORT_FIELDS, extrasaction="ignore")
+        if header:
+            writer.writeheader()
+        writer.writerows(rows)
+    else:
+        for row in rows:
+            buf.write(json.dumps(row, ensure_ascii=False))
+            buf.write("\n")
+    return buf.getvalue().encode("utf-8")
+
+
+def write_export_file(path: str, fmt: str, rows: list[dict]) -> int:
+    """Write the snapshot in chunks and return the bytes written. Runs in the executor."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    written = 0
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        if not rows and fmt == "csv":
+            written += f.write(_encode_chunk([], fmt, header=True))
+        for start in range(0, len(rows), EXPORT_CHUNK_ROWS):
+            chunk = rows[start : start + EXPORT_CHUNK_ROWS]
+            written += f.write(_encode_chunk(chunk, fmt, header=start == 0))
+    os.replace(tmp, path)
+    return written
+
+
+async def async_export_history(hass: HomeAssistant, call: ServiceCall) -> dict:
+    """Write the fuel and maintenance history of one or more cars to a file."""
+    path = call.data["path"]
+    if not os.path.isabs(path):
+        path = hass.config.path(path)
+    if not hass.config.is_allowed_path(path):
+        raise HomeAssistantError(f"Path {path} is not allowed")
+
+    fmt = call.data.get("format") or os.path.splitext(path)[1].lstrip(".").lower()
+    if fmt not in ("csv", "jsonl"):
+        raise HomeAssistantError(f"Unsupported export format {fmt!r}")
+
+    storage = hass.data[DOMAIN]["storage"]
+    known = storage.car_ids()
+    car_ids = call.data.get("car_id") or known
+    if isinstance(car_ids, str):
+        car_ids = [car_ids]
+    car_ids = [car_id for car_id in car_ids if car_id in known]
+
+    local_tz = dt_util.as_local(dt_util.utcnow()).tzinfo
+    start = day_start_us(call.data["start_date"], local_tz) if call.data.get("start_date") else None
+    end = day_start_us(call.data["end_date"], local_tz, days=1) if call.data.get("end_date") else None
+
+    # Copy the entries on the loop so later edits cannot end up half-way in
+    # the file; serializing and writing happens in the executor.
+    rows: list[dict] = []
+    for car_id in car_ids:
+        await storage.async_get_car(car_id)
+        repo = storage.repository(car_id)
+        for log in repo.fuel_logs():
+            for entry in log.between(start, end):
+                rows.append({"car_id": car_id, "kind": KIND_FUEL, **entry, "ts": to_iso(entry["ts"])})
+        if repo.archive is not None:
+            for entry in repo.archive.maintenance.between(start, end):
+                rows.append(
+                    {
+                        "car_id": car_id,
+                        "kind": KIND_MAINTENANCE,
+                        "type": entry["type"],
+                        **entry,
+                        "ts": to_iso(entry["ts"]),
+                    }
+                )
+        for maint_type in repo.maintenance_types():
+            for entry in repo.maintenance(maint_type).between(start, end):
+                rows.append(
+                    {
+                        "car_id": car_id,
+                        "kind": KIND_MAINTENANCE,
+                        "type": maint_type,
+                        **entry,
+                        "ts": to_iso(entry["ts"]),
+                    }
+                )
+        # Let other work run between cars of a large fleet
+        await asyncio.sleep(0)
+
+    try:
+        size = await hass.async_add_executor_job(write_export_file, path, fmt, rows)
+    except OSError as err:
+        raise HomeAssistantError(f"Could not write {path}: {err}") from err
+
+    _LOGGER.info("Exported %s entries of %s cars to %s (%s bytes)", len(rows), len(car_ids), path, size)
+    return {"path": path, "rows": len(rows), "bytes": size, "cars": list(car_ids)}
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import datetime as dt
+import itertools
+import logging
+from collections.abc import Iterable
+
+from homeassistant.components.recorder import get_instance
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import async_add_external_statistics
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util import slugify
+
+from .const import DOMAIN
+from .stats import FuelBucket
+from .timestamps import to_datetime
+
+_LOGGER = logging.getLogger(__name__)
+
+# Rows handed to the recorder per insert
+STATISTICS_BATCH_ROWS = 1000
+
+_HOUR_US = 3_600_000_000
+
+# statistic suffix -> (name, unit, has_sum)
+_STATISTICS = {
+    "fuel_liters": ("Brandstof", "L", True),
+    "fuel_km": ("Gereden km", "km", True),
+    "fuel_cost": ("Brandstofkosten", "EUR", True),
+    "fuel_l_per_100km": ("Verbruik", "L/100km", False),
+}
+
+
+def _statistic_id(car_id: str, suffix: str) -> str:
+    return f"{DOMAIN}:{slugify(car_id) or 'car'}_{suffix}"
+
+
+def _hour(ts: int) -> dt.datetime:
+    return to_datetime(ts - ts % _HOUR_US)
+
+
+def _rows(hour: dt.datetime, total: FuelBucket, closed: list[float]) -> dict[str, StatisticData]:
+    """Rows of one hour: the cumulative totals, and the consumption of the
+    fill-up pairs closing in that hour (closed, in L/100km) if any."""
+    rows = {
+        "fuel_liters": StatisticData(start=hour, state=total.liters, sum=total.liters),
+        "fuel_km": StatisticData(start=hour, state=total.km, sum=total.km),
+        "fuel_cost": StatisticData(start=hour, state=total.spend, sum=total.spend),
+    }
+    if closed:
+        mean = sum(closed) / len(closed)
+        rows["fuel_l_per_100km"] = StatisticData(
+            start=hour, mean=mean, min=min(closed), max=max(closed), state=closed[-1]
+        )
+    return rows
+
+
+def _closed_pairs(entries: list[dict]) -> list[float]:
+    """Consumption of each pair of consecutive fill-ups, for the pairs closed by entries[1:]."""
+    closed = []
+    for prev, cur in zip(entries, entries[1:]):
+        pair = FuelBucket()
+        pair.add_pair(prev, cur, 1)
+        if pair.km > 0:
+            closed.append(pair.liters / pair.km * 100.0)
+    return closed
+
+
+def build_statistics(fuel: Iterable[dict]) -> dict[str, list[StatisticData]]:
+    """Hourly cumulative rows for the whole (sorted) fuel log.
+
+    Liters and km are counted per pair of fill-ups, like the consumption
+    sensors; spend includes every fill-up with a price.
+    """
+    out: dict[str, list[StatisticData]] = {suffix: [] for suffix in _STATISTICS}
+    total = FuelBucket()
+    prev = None
+    hour = None
+    closed: list[float] = []
+    for entry in fuel:
+        entry_hour = _hour(entry["ts"])
+        if hour is not None and entry_hour != hour:
+            # The last fill-up of an hour carries the cumulative values of that hour
+            for suffix, row in _rows(hour, total, closed).items():
+                out[suffix].append(row)
+            closed = []
+        hour = entry_hour
+        total.add_fill(entry, 1)
+        if prev is not None:
+            total.add_pair(prev, entry, 1)
+            closed += _closed_pairs([prev, entry])
+        prev = entry
+    if hour is not None:
+        for suffix, row in _rows(hour, total, closed).items():
+            out[suffix].append(row)
+    return out
+
+
+class StatisticsPublisher:
+    """Publishes the fuel history of each car as external long-term statistics.
+
+    A car is backfilled once; after that a fill-up appended at the end of the
+    log only adds (or overwrites) the row of its hour. Any other change to the
+    fuel log, told apart by its revision, rebuilds that car's statistics.
+    What has been published is kept in the car state (see
+    ``CarLogStorage.statistics_marker``), so a restart does not backfill
+    again and a fill-up does not rewrite the shard.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+
+    @property
+    def available(self) -> bool:
+        return "recorder" in self.hass.config.components
+
+    @callback
+    def async_sync(self, car_id: str) -> None:
+        if not self.available:
+            return
+        storage = self.hass.data[DOMAIN]["storage"]
+        repo = storage.repository(car_id)
+        published = storage.statistics_marker(car_id)
+        latest = repo.fuel_stats.last
+        marker = {
+            "count": repo.fuel_stats.count,
+            "last_ts": latest["ts"] if latest else None,
+            "revision": repo.fuel_revision,
+        }
+        if published == marker:
+            return
+        if not storage.history_loaded(car_id):
+            # Served from its summary: publishing needs the fill-ups themselves
+            self.hass.async_create_task(self._async_sync_loaded(car_id))
+            return
+
+        fuel = repo.fuel
+
+        if (
+            published.get("revision") is not None
+            and marker["revision"] == published["revision"] + 1
+            and marker["count"] == published["count"] + 1
+            and len(fuel) >= 2
+            and fuel[-2]["ts"] == published["last_ts"]
+        ):
+            # Only appended: rewrite the row of its hour
+            hour = _hour(latest["ts"])
+            stats = repo.fuel_stats
+            hour_fills = stats.entries_from(stats.index_before(latest["ts"] - latest["ts"] % _HOUR_US))
+            rows = _rows(hour, stats.total, _closed_pairs(hour_fills))
+            self._add(car_id, {suffix: [row] for suffix, row in rows.items()})
+        else:
+            self._rebuild(car_id, itertools.chain(*repo.fuel_logs()))
+
+        storage.async_set_statistics_marker(car_id, marker)
+
+    async def _async_sync_loaded(self, car_id: str) -> None:
+        await self.hass.data[DOMAIN]["storage"].async_get_car(car_id)
+        self.async_sync(car_id)
+
+    def _rebuild(self, car_id: str, fuel: Iterable[dict]) -> None:
+        get_instance(self.hass).async_clear_statistics(
+            [_statistic_id(car_id, suffix) for suffix in _STATISTICS]
+        )
+        statistics = build_statistics(fuel)
+        _LOGGER.debug("Backfilling %s hourly statistics rows for %s", len(statistics["fuel_km"]), car_id)
+        self._add(car_id, statistics)
+
+    def _add(self, car_id: str, statistics: dict[str, list[StatisticData]]) -> None:
+        car_name = self.hass.data[DOMAIN]["data"]["cars"].get(car_id, {}).get("meta", {}).get("name", car_id)
+        for suffix, rows in statistics.items():
+            if not rows:
+                continue
+            name, unit, has_sum = _STATISTICS[suffix]
+            metadata = StatisticMetaData(
+                has_mean=not has_sum,
+                has_sum=has_sum,
+                name=f"{car_name} {name}",
+                source=DOMAIN,
+                statistic_id=_statistic_id(car_id, suffix),
+                unit_of_measurement=unit,
+            )
+            for start in range(0, len(rows), STATISTICS_BATCH_ROWS):
+                async_add_external_statistics(
+                    self.hass, metadata, rows[start : start + STATISTICS_BATCH_ROWS]
+                )
@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import csv
+import datetime as dt
+import json
+import logging
+import os
+
+from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN, KIND_FUEL, KIND_MAINTENANCE, KIND_META, KIND_UI
+from .timestamps import to_us
+
+_LOGGER = logging.getLogger(__name__)
+
+# Invalid rows reported back in the service response
+MAX_REPORTED_ERRORS = 20
+
+
+def _to_ts(row: dict, local_tz: dt.tzinfo) -> int:
+    if row.get("ts"):
+        parsed = dt_util.parse_datetime(str(row["ts"]))
+        if parsed is None:
+            raise ValueError(f"invalid ts {row['ts']!r}")
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=local_tz)
+    elif row.get("date"):
+        y, m, d = [int(x) for x in str(row["date"]).split("-")]
+        parsed = dt.datetime(y, m, d, 12, 0, 0, tzinfo=local_tz)
+    else:
+        raise ValueError("ts or date is required")
+    return to_us(parsed)
+
+
+def _to_float(value, field: str, required: bool = True) -> float | None:
+    if value is None or value == "":
+        if required:
+            raise ValueError(f"{field} is required")
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"invalid {field} {value!r}") from None
+
+
+def _parse_row(
+    row: dict, default_car_id: str | None, car_ids: set[str], local_tz: dt.tzinfo
+) -> tuple[str, str, dict]:
+    """Validate one import row and return (car_id, kind, entry)."""
+    car_id = row.get("car_id") or default_car_id
+    if not car_id:
+        raise ValueError("car_id is required")
+    if car_id not in car_ids:
+        raise ValueError(f"unknown car_id {car_id!r}")
+
+    kind = row.get("kind") or (KIND_FUEL if row.get("liters") not in (None, "") else KIND_MAINTENANCE)
+    ts = _to_ts(row, local_tz)
+    km = _to_float(row.get("odometer_km"), "odometer_km")
+    if km < 0:
+        raise ValueError("odometer_km must be positive")
+
+    if kind == KIND_FUEL:
+        liters = _to_float(row.get("liters"), "liters")
+        if liters <= 0:
+            raise ValueError("liters must be greater than 0")
+        return car_id, kind, {
+            "ts": ts,
+            "odometer_km": km,
+            "liters": liters,
+            "price_total": _to_float(row.get("price_total"), "price_total", required=False),
+        }
+
+    if kind == KIND_MAINTENANCE:
+        if not row.get("type"):
+            raise ValueError("type is required")
+        return car_id, kind, {
+            "type": str(row["type"]),
+            "ts": ts,
+            "odometer_km": km,
+            "note": row.get("note") or "",
+        }
+
+    raise ValueError(f"unknown kind {kind!r}")
+
+
+def _iter_file(path: str, fmt: str):
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            yield from csv.DictReader(f)
+        elif fmt == "jsonl":
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            data = json.load(f)
+            if isinstance(data, dict):
+                # {"fuel": [...], "maintenance": [...]}
+                for kind, rows in data.items():
+                    for row in rows:
+                        yield {"kind": kind, **row}
+            else:
+                yield from data
+
+
+def read_import_file(
+    path: str, fmt: str, default_car_id: str | None, car_ids: set[str], local_tz: dt.tzinfo
+) -> tuple[list[tuple[str, str, dict]], list[dict]]:
+    """Parse and validate an import file. Runs in the executor.
+
+    Rows of cars not in car_ids are invalid: an import never creates a car.
+    """
+    rows = []
+    errors = []
+    for line_no, row in enumerate(_iter_file(path, fmt), start=1):
+        try:
+            rows.append(_parse_row(row, default_car_id, car_ids, local_tz))
+        except (ValueError, TypeError, AttributeError) as err:
+            errors.append({"row": line_no, "error": str(err)})
+    return rows, errors
+
+
+async def async_import_history(
+    hass: HomeAssistant, call: ServiceCall
+) -> tuple[dict, dict[str, list[str]]]:
+    """Import fuel and maintenance rows from a file in one batch.
+
+    Returns the service response and the changed kinds per car.
+    """
+    path = call.data["path"]
+    if not os.path.isabs(path):
+        path = hass.config.path(path)
+    if not hass.config.is_allowed_path(path):
+        raise HomeAssistantError(f"Path {path} is not allowed")
+
+    fmt = call.data.get("format") or os.path.splitext(path)[1].lstrip(".").lower()
+    if fmt not in ("csv", "json", "jsonl"):
+        raise HomeAssistantError(f"Unsupported import format {fmt!r}")
+
+    storage = hass.data[DOMAIN]["storage"]
+    local_tz = dt_util.as_local(dt_util.utcnow()).tzinfo
+    try:
+        rows, errors = await hass.async_add_executor_job(
+            read_import_file, path, fmt, call.data.get("car_id"), set(storage.car_ids()), local_tz
+        )
+    except (OSError, ValueError) as err:
+        raise HomeAssistantError(f"Could not read {path}: {err}") from err
+
+    by_car: dict[str, list[tuple[str, dict]]] = {}
+    for car_id, kind, entry in rows:
+        by_car.setdefault(car_id, []).append((kind, entry))
+
+    imported = {KIND_FUEL: 0, KIND_MAINTENANCE: 0}
+    duplicates = 0
+    archived = 0
+    changed: dict[str, list[str]] = {}
+
+    for car_id, car_rows in by_car.items():
+        car = await storage.async_get_car(car_id)
+        repo = storage.repository(car_id)
+
+        seen_fuel = {(e["ts"], e.get("odometer_km"), e.get("liters")) for e in repo.fuel}
+        # The archive is final: rows at or before it are not imported
+        archived_until = {kind: repo.archived_until(kind) for kind in (KIND_FUEL, KIND_MAINTENANCE)}
+        seen_maint: dict[str, set] = {}
+        new_fuel = []
+        new_maint: dict[str, list[dict]] = {}
+
+        for kind, entry in car_rows:
+            if archived_until[kind] is not None and entry["ts"] <= archived_until[kind]:
+                archived += 1
+                continue
+            if kind == KIND_FUEL:
+                key = (entry["ts"], entry["odometer_km"], entry["liters"])
+                if key in seen_fuel:
+                    duplicates += 1
+                    continue
+                seen_fuel.add(key)
+                new_fuel.append(entry)
+            else:
+                maint_type = entry.pop("type")
+                seen = seen_maint.get(maint_type)
+                if seen is None:
+                    seen = seen_maint[maint_type] = {
+                        (e["ts"], e.get("odometer_km")) for e in repo.maintenance(maint_type)
+                    }
+                key = (entry["ts"], entry["odometer_km"])
+                if key in seen:
+                    duplicates += 1
+                    continue
+                seen.add(key)
+                new_maint.setdefault(maint_type, []).append(entry)
+
+        kinds = []
+        if new_fuel:
+            repo.add_fuel_many(new_fuel)
+            imported[KIND_FUEL] += len(new_fuel)
+            kinds.append(KIND_FUEL)
+        for maint_type, entries in new_maint.items():
+            repo.add_maintenance_many(maint_type, entries)
+            imported[KIND_MAINTENANCE] += len(entries)
+        if new_maint:
+            kinds.append(KIND_MAINTENANCE)
+        if not kinds:
+            continue
+
+        max_km = max(e["odometer_km"] for e in new_fuel + [e for v in new_maint.values() for e in v])
+        meta = car.setdefault("meta", {})
+        if meta.get("odometer_km") is None or max_km > float(meta["odometer_km"]):
+            meta["odometer_km"] = max_km
+            car.setdefault("ui", {})["odometer_km"] = max_km
+            kinds += [KIND_META, KIND_UI]
+            storage.async_schedule_ui_save(car_id)
+
+        storage.async_schedule_save(car_id)
+        changed[car_id] = kinds
+
+    # The whole batch is committed with one flush of the touched shards
+    await storage.async_flush()
+
+    _LOGGER.info(
+        "Imported %s fuel and %s maintenance entries from %s (%s duplicates, %s archived, %s invalid)",
+        imported[KIND_FUEL],
+        imported[KIND_MAINTENANCE],
+        path,
+        duplicates,
+        archived,
+        len(errors),
+    )
+    response = {
+        "imported_fuel": imported[KIND_FUEL],
+        "imported_maintenance": imported[KIND_MAINTENANCE],
+        "duplicates": duplicates,
+        "archived": archived,
+        "invalid": len(errors),
+        "errors": errors[:MAX_REPORTED_ERRORS],
+        "cars": sorted(changed),
+    }
+    return response, changed
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import bisect
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+
+# Bucket upper bounds: durations from 10 µs doubling up to ~170 s, sizes from
+# 256 B doubling up to 64 MiB. Anything larger lands in a final overflow bucket.
+DURATION_BOUNDS = tuple(0.00001 * 2**n for n in range(25))
+SIZE_BOUNDS = tuple(256 * 2**n for n in range(19))
+
+
+class Histogram:
+    """Fixed-size histogram with exponential buckets.
+
+    Recording is a bisect and a few additions whatever the number of samples,
+    so it can sit on hot paths. Percentiles are reported as the upper bound
+    of the bucket they fall in (capped at the largest value seen).
+    """
+
+    __slots__ = ("bounds", "counts", "count", "total", "max")
+
+    def __init__(self, bounds: tuple[float, ...] = DURATION_BOUNDS) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: Histogram) -> None:
+        for idx, count in enumerate(other.counts):
+            self.counts[idx] += count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, q: float) -> float | None:
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for idx, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(self.bounds[idx], self.max) if idx < len(self.bounds) else self.max
+        return self.max
+
+    @property
+    def is_size(self) -> bool:
+        return self.bounds is SIZE_BOUNDS
+
+    def summary(self) -> dict:
+        return self.as_dict(scale=1, unit="bytes") if self.is_size else self.as_dict()
+
+    def as_dict(self, scale: float = 1000.0, unit: str = "ms") -> dict:
+        """Summary in the given unit; durations are recorded in seconds."""
+
+        def scaled(value: float | None) -> float | None:
+            return round(value * scale, 3) if value is not None else None
+
+        return {
+            "count": self.count,
+            f"mean_{unit}": scaled(self.total / self.count if self.count else None),
+            f"p50_{unit}": scaled(self.percentile(0.5)),
+            f"p95_{unit}": scaled(self.percentile(0.95)),
+            f"p99_{unit}": scaled(self.percentile(0.99)),
+            f"max_{unit}": scaled(self.max if self.count else None),
+        }
+
+
+class Instrumentation:
+    """Timings, store write sizes and dispatch fan-out, kept per car.
+
+    Everything is recorded under a car_id (None for work not tied to one
+    car), so the diagnostic sensors of a car show only its own numbers and
+    the diagnostics download can add up the whole integration.
+    """
+
+    def __init__(self) -> None:
+        self._histograms: dict[tuple[str | None, str], Histogram] = {}
+        # (car_id, kind) -> [sends, receivers reached]
+        self._dispatch: dict[tuple[str, str], list[int]] = {}
+        self._listeners: dict[tuple[str, str], int] = {}
+        # Filled in by the storage once Home Assistant has started
+        self.startup: dict | None = None
+
+    def record(self, car_id: str | None, name: str, value: float, bounds=DURATION_BOUNDS) -> None:
+        histogram = self._histograms.get((car_id, name))
+        if histogram is None:
+            histogram = self._histograms[(car_id, name)] = Histogram(bounds)
+        histogram.record(value)
+
+    @contextmanager
+    def timed(self, car_id: str | None, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(car_id, name, time.perf_counter() - start)
+
+    def record_save(self, car_id: str | None, seconds: float, size: int) -> None:
+        self.record(car_id, "store.save", seconds)
+        self.record(car_id, "store.save_bytes", size, SIZE_BOUNDS)
+
+    def connected(self, car_id: str, kind: str, delta: int) -> None:
+        self._listeners[(car_id, kind)] = self._listeners.get((car_id, kind), 0) + delta
+
+    def dispatched(self, car_id: str, kind: str) -> None:
+        counts = self._dispatch.get((car_id, kind))
+        if counts is None:
+            counts = self._dispatch[(car_id, kind)] = [0, 0]
+        counts[0] += 1
+        counts[1] += self._listeners.get((car_id, kind), 0)
+
+    def histograms(self, car_id: str | None = None, prefix: str = "") -> dict[str, Histogram]:
+        """Histograms by name for one car, or merged over all of them when car_id is None."""
+        merged: dict[str, Histogram] = {}
+        for (scope, name), histogram in self._histograms.items():
+            if not name.startswith(prefix) or (car_id is not None and scope != car_id):
+                continue
+            target = merged.get(name)
+            if target is None:
+                target = merged[name] = Histogram(histogram.bounds)
+            target.merge(histogram)
+        return merged
+
+    def dispatch(self, car_id: str | None = None) -> dict[str, dict]:
+        by_kind: dict[str, list[int]] = {}
+        for (scope, kind), (sends, receivers) in self._dispatch.items():
+            if car_id is not None and scope != car_id:
+                continue
+            counts = by_kind.setdefault(kind, [0, 0])
+            counts[0] += sends
+            counts[1] += receivers
+        return {
+            kind: {"sends": sends, "receivers": receivers, "fanout": round(receivers / sends, 2)}
+            for kind, (sends, receivers) in sorted(by_kind.items())
+        }
+
+    def as_dict(self, car_id: str | None = None) -> dict:
+        timings = {name: histogram.summary() for name, histogram in sorted(self.histograms(car_id).items())}
+        result = {"timings": timings, "dispatch": self.dispatch(car_id)}
+        if car_id is None:
+            result["startup"] = self.startup
+        return result
+
+
+def get_instrumentation(hass: HomeAssistant) -> Instrumentation:
+    data = hass.data.setdefault(DOMAIN, {})
+    instrumentation = data.get("instrumentation")
+    if instrumentation is None:
+        instrumentation = data["instrumentation"] = Instrumentation()
+    return instrumentation
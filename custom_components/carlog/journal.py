@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+
+from homeassistant.core import HomeAssistant
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class CarJournal:
+    """Append-only JSON Lines journal of the history events of one car.
+
+    Every event carries a sequence number. The shard snapshot records the
+    last sequence number it contains, so replay only applies newer events
+    and compaction can drop everything the snapshot already covers.
+    """
+
+    def __init__(self, hass: HomeAssistant, path: str) -> None:
+        self.hass = hass
+        self.path = path
+        self.entries = 0
+        self.size = 0
+        self._lock = asyncio.Lock()
+
+    async def async_read(self, after_seq: int) -> list[dict]:
+        """Return the events newer than after_seq, in sequence order."""
+        async with self._lock:
+            events, self.entries, self.size = await self.hass.async_add_executor_job(
+                self._read, after_seq
+            )
+        return events
+
+    def _read(self, after_seq: int) -> tuple[list[dict], int, int]:
+        try:
+            with open(self.path, "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return [], 0, 0
+
+        if raw and not raw.endswith(b"\n"):
+            # Torn final line from a crash during append: cut it off so the
+            # next append starts on a fresh line
+            keep = raw.rfind(b"\n") + 1
+            _LOGGER.warning("Discarding incomplete last line of %s", self.path)
+            with open(self.path, "r+b") as f:
+                f.truncate(keep)
+            raw = raw[:keep]
+
+        events = []
+        lines = raw.splitlines()
+        for line in lines:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                _LOGGER.warning("Skipping unreadable line in %s", self.path)
+                continue
+            if event.get("seq", 0) > after_seq:
+                events.append(event)
+        events.sort(key=lambda e: e["seq"])
+        return events, len(lines), len(raw)
+
+    async def async_append(self, events: list[dict]) -> None:
+        """Append events with one write; on failure none of them is in the journal."""
+        raw = b"".join((json.dumps(event, separators=(",", ":")) + "\n").encode() for event in events)
+        async with self._lock:
+            await self.hass.async_add_executor_job(self._append, raw)
+            self.entries += len(events)
+            self.size += len(raw)
+
+    def _append(self, raw: bytes) -> None:
+        with open(self.path, "ab") as f:
+            start = f.tell()
+            try:
+                f.write(raw)
+                f.flush()
+                os.fsync(f.fileno())
+            except OSError:
+                # Leave no partial events behind to be replayed later
+                f.truncate(start)
+                raise
+
+    async def async_compact(self, snapshot_seq: int) -> None:
+        """Drop the events that are contained in the snapshot."""
+        async with self._lock:
+            self.entries, self.size = await self.hass.async_add_executor_job(
+                self._compact, snapshot_seq
+            )
+
+    def _compact(self, snapshot_seq: int) -> tuple[int, int]:
+        try:
+            with open(self.path, "rb") as f:
+                lines = f.read().splitlines(keepends=True)
+        except FileNotFoundError:
+            return 0, 0
+
+        keep = []
+        for line in lines:
+            try:
+                seq = json.loads(line).get("seq", 0)
+            except ValueError:
+                continue
+            if seq > snapshot_seq:
+                keep.append(line)
+
+        if not keep:
+            os.remove(self.path)
+            return 0, 0
+
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "wb") as f:
+            f.writelines(keep)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        return len(keep), sum(len(line) for line in keep)
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import bisect
+import datetime as dt
+
+from .const import DEFAULT_MAINTENANCE_TYPES
+from .repository import CarRepository
+from .timestamps import to_datetime, to_iso
+
+_DAY_US = 86_400_000_000
+
+
+def _maintenance_due(
+    meta: dict, maint_type: str, last: dict | None, odometer_km: float | None
+) -> tuple[dict, dt.datetime | None]:
+    """Due status of one maintenance type and the moment it becomes due by date.
+
+    Only depends on the car's data, so it is memoized per revision; whether
+    the due date has passed is checked at read time by due_now.
+    """
+    defaults = meta.get("maintenance_defaults", {})
+    rule = defaults.get(maint_type, {})
+    interval_km = rule.get("interval_km")
+    interval_days = rule.get("interval_days")
+
+    due_km = None
+    due_date = None
+    due_dt = None
+    is_due = False
+
+    if last and interval_km is not None and odometer_km is not None:
+        due_at_km = float(last.get("odometer_km", 0)) + float(interval_km)
+        due_km = max(0.0, due_at_km - float(odometer_km))
+        if float(odometer_km) >= due_at_km:
+            is_due = True
+
+    if last and interval_days is not None:
+        due_dt = to_datetime(last["ts"] + int(interval_days) * _DAY_US)
+        due_date = due_dt.date().isoformat()
+
+    return {
+        "is_due": is_due,
+        "km_remaining": due_km,
+        "due_date": due_date,
+        "last_done_km": last.get("odometer_km") if last else None,
+        "last_done_ts": to_iso(last["ts"]) if last else None,
+        "label": rule.get("label", maint_type),
+        "interval_km": interval_km,
+        "interval_days": interval_days,
+    }, due_dt
+
+
+def due_now(due: dict, due_dt: dt.datetime | None) -> dict:
+    if due["is_due"] or due_dt is None or dt.datetime.now(dt.timezone.utc) < due_dt:
+        return due
+    return {**due, "is_due": True}
+
+
+def maintenance_types(meta: dict) -> list[str]:
+    """Maintenance types with a due rule for a car."""
+    types = list(DEFAULT_MAINTENANCE_TYPES)
+    types += [t for t in meta.get("maintenance_defaults", {}) if t not in DEFAULT_MAINTENANCE_TYPES]
+    return types
+
+
+def get_maintenance_due(repo: CarRepository, maint_type: str) -> tuple[dict, dt.datetime | None]:
+    """Memoized _maintenance_due for the current revision of the car."""
+
+    def compute():
+        meta = repo.car.get("meta", {})
+        last = repo.maintenance(maint_type).latest()
+        return _maintenance_due(meta, maint_type, last, meta.get("odometer_km"))
+
+    return repo.memo(("maintenance_due", maint_type), compute)
+
+
+class DueIndex:
+    """Fleet-wide (car, maintenance type) pairs ordered by due date and by km left.
+
+    Both orders are kept as sorted lists, so updating a pair is a bisect and
+    a list insert, and the most urgent pairs are read from the front.
+    """
+
+    def __init__(self) -> None:
+        self._by_date: list[tuple[dt.datetime, str, str]] = []
+        self._by_km: list[tuple[float, str, str]] = []
+        self._entries: dict[tuple[str, str], tuple[str, dict, dt.datetime | None]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def update(self, car_id: str, name: str, maint_type: str, due: dict, due_dt: dt.datetime | None) -> None:
+        self.remove(car_id, maint_type)
+        if due_dt is None and due["km_remaining"] is None:
+            return
+        self._entries[(car_id, maint_type)] = (name, due, due_dt)
+        if due_dt is not None:
+            bisect.insort(self._by_date, (due_dt, car_id, maint_type))
+        if due["km_remaining"] is not None:
+            bisect.insort(self._by_km, (due["km_remaining"], car_id, maint_type))
+
+    def remove(self, car_id: str, maint_type: str) -> None:
+        old = self._entries.pop((car_id, maint_type), None)
+        if old is None:
+            return
+        _, due, due_dt = old
+        if due_dt is not None:
+            _discard(self._by_date, (due_dt, car_id, maint_type))
+        if due["km_remaining"] is not None:
+            _discard(self._by_km, (due["km_remaining"], car_id, maint_type))
+
+    def remove_car(self, car_id: str) -> None:
+        for key in [key for key in self._entries if key[0] == car_id]:
+            self.remove(*key)
+
+    def due_soon(self, until: dt.datetime | None, km: float | None, limit: int) -> list[dict]:
+        """Up to limit pairs due before until or within km, most urgent first."""
+        keys: dict[tuple[str, str], None] = {}
+        if until is not None:
+            for due_dt, car_id, maint_type in self._by_date[:limit]:
+                if due_dt > until:
+                    break
+                keys[(car_id, maint_type)] = None
+        if km is not None:
+            for km_remaining, car_id, maint_type in self._by_km[:limit]:
+                if km_remaining > km:
+                    break
+                keys[(car_id, maint_type)] = None
+
+        items = []
+        for car_id, maint_type in keys:
+            name, due, due_dt = self._entries[(car_id, maint_type)]
+            due = due_now(due, due_dt)
+            items.append(
+                {
+                    "car_id": car_id,
+                    "name": name,
+                    "type": maint_type,
+                    "label": due["label"],
+                    "is_due": due["is_due"],
+                    "due_date": due["due_date"],
+                    "km_remaining": due["km_remaining"],
+                }
+            )
+        items.sort(key=_urgency)
+        return items[:limit]
+
+
+def _urgency(item: dict) -> tuple:
+    km_remaining = item["km_remaining"]
+    return (
+        not item["is_due"],
+        item["due_date"] or "9999-12-31",
+        km_remaining if km_remaining is not None else float("inf"),
+    )
+
+
+def _discard(index: list, item: tuple) -> None:
+    idx = bisect.bisect_left(index, item)
+    if idx < len(index) and index[idx] == item:
+        del index[idx]
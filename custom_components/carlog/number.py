@@ -3,10 +3,9 @@ from __future__ import annotations
 from homeassistant.components.number import NumberEntity
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.dispatcher import async_dispatcher_connect
 
-from .const import DOMAIN
-from .__init__ import SIGNAL_UPDATED
+from .const import DOMAIN, KIND_META, KIND_UI
+from .__init__ import async_connect_car, async_notify, async_write_if_changed
 
 
 async def async_setup_entry(hass: HomeAssistant, entry, async_add_entities: AddEntitiesCallback) -> None:
@@ -18,13 +17,16 @@ async def async_setup_entry(hass: HomeAssistant, entry, async_add_entities: AddE
             CarUiNumber(hass, car_id, name, "liters", "Liters (invoer)", 0, 200, 0.1, "L", "mdi:gas-station"),
             CarUiNumber(hass, car_id, name, "price_total", "Totaalprijs (invoer)", 0, 9999, 0.01, "EUR", "mdi:currency-eur"),
             CarTankCapacityNumber(hass, car_id, name),
+            CarRetentionNumber(hass, car_id, name),
         ],
-        update_before_add=True,
     )
 
 
 class CarUiNumber(NumberEntity):
     _attr_has_entity_name = True
+    _attr_should_poll = False
+    _signal_kinds = (KIND_UI,)
+    _last_written: tuple | None = None
 
     def __init__(self, hass: HomeAssistant, car_id: str, car_name: str, key: str, title: str,
                  min_v: float, max_v: float, step: float, unit: str | None, icon: str):
@@ -58,27 +60,30 @@ class CarUiNumber(NumberEntity):
     async def async_set_native_value(self, value: float) -> None:
         car = self._car()
         car.setdefault("ui", {})[self.key] = float(value)
-        await self.hass.data[DOMAIN]["store"].async_save(self.hass.data[DOMAIN]["data"])
-        self.async_write_ha_state()
+        self.hass.data[DOMAIN]["storage"].async_schedule_ui_save(self.car_id)
+        async_write_if_changed(self)
 
     async def async_added_to_hass(self) -> None:
-        self._unsub = async_dispatcher_connect(self.hass, SIGNAL_UPDATED, self._handle_update)
+        self._unsub = async_connect_car(self.hass, self.car_id, self._signal_kinds, self._handle_update)
 
     async def async_will_remove_from_hass(self) -> None:
         if self._unsub:
             self._unsub()
 
     def _handle_update(self) -> None:
-        self.async_write_ha_state()
+        async_write_if_changed(self)
 
 
 class CarTankCapacityNumber(NumberEntity):
     _attr_has_entity_name = True
+    _attr_should_poll = False
     _attr_icon = "mdi:gas-station-outline"
     _attr_native_unit_of_measurement = "L"
     _attr_native_min_value = 0
     _attr_native_max_value = 200
     _attr_native_step = 0.1
+    _signal_kinds = (KIND_META,)
+    _last_written: tuple | None = None
 
     def __init__(self, hass: HomeAssistant, car_id: str, car_name: str):
         self.hass = hass
@@ -104,17 +109,44 @@ class CarTankCapacityNumber(NumberEntity):
         return float(cap) if cap is not None else None
 
     async def async_set_native_value(self, value: float) -> None:
-        car = self._car()
+        # Writing the meta rewrites the shard, which needs the full history
+        car = await self.hass.data[DOMAIN]["storage"].async_get_car(self.car_id)
         car.setdefault("meta", {})["tank_capacity_l"] = float(value)
-        await self.hass.data[DOMAIN]["store"].async_save(self.hass.data[DOMAIN]["data"])
-        self.async_write_ha_state()
+        self.hass.data[DOMAIN]["storage"].async_schedule_save(self.car_id)
+        async_notify(self.hass, self.car_id, KIND_META)
 
     async def async_added_to_hass(self) -> None:
-        self._unsub = async_dispatcher_connect(self.hass, SIGNAL_UPDATED, self._handle_update)
+        self._unsub = async_connect_car(self.hass, self.car_id, self._signal_kinds, self._handle_update)
 
     async def async_will_remove_from_hass(self) -> None:
         if self._unsub:
             self._unsub()
 
     def _handle_update(self) -> None:
-        self.async_write_ha_state()
+        async_write_if_changed(self)
+
+
+class CarRetentionNumber(CarTankCapacityNumber):
+    """Years of history kept in the shard; older entries go to the archive. 0 keeps everything."""
+
+    _attr_icon = "mdi:archive-clock-outline"
+    _attr_native_unit_of_measurement = "jaar"
+    _attr_native_min_value = 0
+    _attr_native_max_value = 50
+    _attr_native_step = 1
+
+    def __init__(self, hass: HomeAssistant, car_id: str, car_name: str):
+        super().__init__(hass, car_id, car_name)
+        self._attr_name = "Bewaartermijn historie"
+        self._attr_unique_id = f"{car_id}_retention_years"
+
+    @property
+    def native_value(self):
+        return self._car().setdefault("meta", {}).get("retention_years") or 0
+
+    async def async_set_native_value(self, value: float) -> None:
+        car = await self.hass.data[DOMAIN]["storage"].async_get_car(self.car_id)
+        car.setdefault("meta", {})["retention_years"] = int(value) or None
+        # Archiving happens with the next write of the shard
+        self.hass.data[DOMAIN]["storage"].async_schedule_save(self.car_id)
+        async_notify(self.hass, self.car_id, KIND_META)
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+from collections.abc import Iterator
+
+from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN, KIND_FUEL
+from .stats import FuelBucket
+from .timestamps import day_start_us, to_iso
+
+# Entries per page of query_fuel / query_maintenance
+QUERY_DEFAULT_LIMIT = 100
+QUERY_MAX_LIMIT = 1000
+
+
+def _car_ids(hass: HomeAssistant, requested: str | list[str] | None) -> list[str]:
+    known = hass.data[DOMAIN]["storage"].car_ids()
+    if not requested:
+        return known
+    if isinstance(requested, str):
+        requested = [requested]
+    return [car_id for car_id in requested if car_id in known]
+
+
+async def async_get_costs(hass: HomeAssistant, call: ServiceCall) -> dict:
+    """Fuel cost aggregates per car and month, read from the running buckets.
+
+    A car started from its summary answers from it while the summary holds
+    the months asked for; older months need its history.
+    """
+    storage = hass.data[DOMAIN]["storage"]
+    start = call.data.get("start_month")
+    end = call.data.get("end_month")
+
+    fleet = FuelBucket()
+    cars = {}
+    for car_id in _car_ids(hass, call.data.get("car_id")):
+        car = await storage.async_get_car(car_id, history=False)
+        stats = storage.repository(car_id).fuel_stats
+        if not storage.history_loaded(car_id) and not stats.holds_months_from(start):
+            car = await storage.async_get_car(car_id)
+            stats = storage.repository(car_id).fuel_stats
+        months = {
+            month: bucket
+            for month, bucket in stats.months.items()
+            if (start is None or month >= start) and (end is None or month <= end)
+        }
+        if start is None and end is None:
+            total = stats.total
+        else:
+            total = FuelBucket()
+            for bucket in months.values():
+                total.merge(bucket)
+        fleet.merge(total)
+        cars[car_id] = {
+            "name": car.get("meta", {}).get("name", car_id),
+            "total": total.as_dict(),
+            "months": {month: months[month].as_dict() for month in sorted(months)},
+        }
+        await asyncio.sleep(0)
+
+    return {"fleet": fleet.as_dict(), "cars": cars}
+
+
+def _scan(log, start: int | None, end: int | None, maint_type: str | None = None) -> Iterator[dict]:
+    """Entries of a sorted log with start <= ts < end, found by bisection."""
+    lo = log.position(start) if start is not None else 0
+    hi = log.position(end) if end is not None else len(log)
+    for idx in range(lo, hi):
+        entry = {**log[idx]}
+        if maint_type is not None:
+            entry["type"] = maint_type
+        yield entry
+
+
+def _parse_cursor(cursor: str | None) -> tuple[int, int] | None:
+    if not cursor:
+        return None
+    try:
+        ts, skip = cursor.split(":")
+        return int(ts), int(skip)
+    except ValueError:
+        raise HomeAssistantError(f"Invalid cursor {cursor!r}") from None
+
+
+def _page(
+    streams: list[Iterator[dict]],
+    cursor: tuple[int, int] | None,
+    limit: int,
+    min_km: float | None,
+    max_km: float | None,
+) -> tuple[list[dict], str | None]:
+    """Up to limit entries of the merged streams and the cursor of the next page.
+
+    A cursor is the timestamp to continue at plus the number of entries with
+    that timestamp already consumed, so equal timestamps are never skipped or
+    repeated. The odometer range only filters, the logs are ordered by time.
+    """
+    skip_ts, skip = cursor or (None, 0)
+    items: list[dict] = []
+    cur_ts = None
+    seen = 0
+    # heapq.merge is stable, so equal timestamps keep the order of the streams
+    for entry in heapq.merge(*streams, key=lambda entry: entry["ts"]):
+        ts = entry["ts"]
+        if ts != cur_ts:
+            cur_ts, seen = ts, 0
+        if ts == skip_ts and seen < skip:
+            seen += 1
+            continue
+        if len(items) == limit:
+            return items, f"{cur_ts}:{seen}"
+        seen += 1
+        km = float(entry.get("odometer_km", 0))
+        if (min_km is None or km >= min_km) and (max_km is None or km <= max_km):
+            items.append({**entry, "ts": to_iso(ts)})
+    return items, None
+
+
+async def async_query_history(hass: HomeAssistant, call: ServiceCall, kind: str) -> dict:
+    """One page of the fuel or maintenance entries of a car."""
+    storage = hass.data[DOMAIN]["storage"]
+    car_id = call.data["car_id"]
+    if car_id not in storage.car_ids():
+        raise HomeAssistantError(f"Unknown car {car_id!r}")
+
+    local_tz = dt_util.as_local(dt_util.utcnow()).tzinfo
+    start = day_start_us(call.data["start_date"], local_tz) if call.data.get("start_date") else None
+    end = day_start_us(call.data["end_date"], local_tz, days=1) if call.data.get("end_date") else None
+    limit = min(max(int(call.data.get("limit", QUERY_DEFAULT_LIMIT)), 1), QUERY_MAX_LIMIT)
+    cursor = _parse_cursor(call.data.get("cursor"))
+    if cursor is not None:
+        # Continue at the cursor; it always lies within the original range
+        start = cursor[0]
+    min_km = call.data.get("min_odometer_km")
+    max_km = call.data.get("max_odometer_km")
+
+    await storage.async_get_car(car_id)
+    repo = storage.repository(car_id)
+    if kind == KIND_FUEL:
+        streams = [_scan(log, start, end) for log in repo.fuel_logs()]
+    else:
+        only = call.data.get("type")
+        types = [only] if only else repo.maintenance_types()
+        streams = [_scan(repo.maintenance(maint_type), start, end, maint_type) for maint_type in types]
+        if repo.archive is not None:
+            # One log for all types, older than any of the logs above
+            archived = _scan(repo.archive.maintenance, start, end)
+            streams.insert(0, (entry for entry in archived if only is None or entry["type"] == only))
+
+    items, next_cursor = _page(
+        streams,
+        cursor,
+        limit,
+        float(min_km) if min_km is not None else None,
+        float(max_km) if max_km is not None else None,
+    )
+    return {"car_id": car_id, "items": items, "next_cursor": next_cursor}
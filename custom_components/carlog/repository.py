@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import bisect
+from collections.abc import Callable, Hashable, Iterator
+from contextlib import AbstractContextManager, nullcontext
+from typing import TYPE_CHECKING, Any
+
+from .columns import FuelLog
+from .const import FUEL_RECENT_FILLS
+from .stats import FuelStats
+from .timestamps import to_us
+
+if TYPE_CHECKING:
+    from .archive import ArchiveLog, CarArchive
+
+
+def _ts_key(entry: dict) -> int:
+    return entry["ts"]
+
+
+def _untimed(name: str) -> AbstractContextManager:
+    return nullcontext()
+
+
+class EventLog:
+    """Timestamp-sorted log of entries, backed by the list stored in the car.
+
+    The list is sorted once when the log is created and kept sorted on every
+    insert. A parallel list of timestamps serves as the ts -> position index,
+    so lookups, the latest entry and inserts never scan or re-sort the log.
+    """
+
+    def __init__(self, entries: list[dict]) -> None:
+        entries.sort(key=_ts_key)
+        self.entries = entries
+        self._keys = [_ts_key(entry) for entry in entries]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __iter__(self) -> Iterator[dict]:
+        return iter(self.entries)
+
+    def __getitem__(self, idx: int) -> dict:
+        return self.entries[idx]
+
+    def latest(self) -> dict | None:
+        return self.entries[-1] if self.entries else None
+
+    def index_of(self, ts: int | str) -> int | None:
+        try:
+            key = to_us(ts)
+        except (TypeError, ValueError):
+            return None
+        idx = bisect.bisect_left(self._keys, key)
+        if idx < len(self._keys) and self._keys[idx] == key:
+            return idx
+        return None
+
+    def get(self, ts: int | str) -> dict | None:
+        idx = self.index_of(ts)
+        return self.entries[idx] if idx is not None else None
+
+    def position(self, ts: int | str) -> int:
+        """Index of the first entry at or after ts."""
+        return bisect.bisect_left(self._keys, to_us(ts))
+
+    def between(self, start: int | str | None = None, end: int | str | None = None) -> list[dict]:
+        """Entries with start <= ts < end; either bound may be omitted."""
+        lo = self.position(start) if start is not None else 0
+        hi = self.position(end) if end is not None else len(self._keys)
+        return self.entries[lo:hi]
+
+    def insert(self, entry: dict) -> int:
+        key = _ts_key(entry)
+        idx = bisect.bisect_right(self._keys, key)
+        self._keys.insert(idx, key)
+        self.entries.insert(idx, entry)
+        return idx
+
+    def update(self, idx: int, changes: dict) -> int:
+        """Apply changes to the entry at idx and return its new position."""
+        if "ts" in changes and to_us(changes["ts"]) != self._keys[idx]:
+            entry = self.pop(idx)
+            entry.update(changes)
+            return self.insert(entry)
+        self.entries[idx].update(changes)
+        return idx
+
+    def pop(self, idx: int) -> dict:
+        del self._keys[idx]
+        return self.entries.pop(idx)
+
+    def split_head(self, count: int) -> list[dict]:
+        """Remove and return the count oldest entries."""
+        head = self.entries[:count]
+        del self.entries[:count], self._keys[:count]
+        return head
+
+    def extend(self, entries: list[dict]) -> None:
+        """Add many entries at once with a single sort instead of one insert each."""
+        self.entries.extend(entries)
+        self.entries.sort(key=_ts_key)
+        self._keys = [_ts_key(entry) for entry in self.entries]
+
+
+class CarRepository:
+    """Access to the fuel and maintenance history of one car.
+
+    All reads and mutations of ``car["fuel"]`` and ``car["maintenance"]``
+    go through here so the logs stay sorted and the fuel aggregate in sync.
+
+    ``revision`` is bumped on every change of the car (see ``async_notify``);
+    values derived from the history are memoized against it. Recomputations
+    are measured through ``timed`` when given.
+
+    ``meta["fuel_revision"]`` counts the changes to the fuel log. It is
+    stored with the car, so it also tells what changed across restarts.
+
+    With an archive (see ``archive_before``) the logs here only hold the
+    entries after it; the fuel aggregate and maintenance counts still cover
+    the whole history.
+    """
+
+    def __init__(
+        self,
+        car: dict,
+        timed: Callable[[str], AbstractContextManager] | None = None,
+        archive: CarArchive | None = None,
+    ) -> None:
+        self.car = car
+        self._timed = timed or _untimed
+        self.archive = archive
+        fuel = car.get("fuel")
+        if isinstance(fuel, dict):
+            fuel = car["fuel"] = FuelLog.from_columns(fuel)
+        elif not isinstance(fuel, FuelLog):
+            fuel = car["fuel"] = FuelLog.from_entries(fuel or [])
+        self.fuel = fuel
+        with self._timed("fuel_stats.rebuild"):
+            self.fuel_stats = FuelStats(self.fuel, archive)
+        self._maintenance: dict[str, EventLog] = {}
+        self.revision = 0
+        self._memo: dict[Hashable, tuple[int, Any]] = {}
+
+    def bump(self) -> None:
+        self.revision += 1
+
+    def memo(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Return compute(), computed at most once per revision of the car."""
+        cached = self._memo.get(key)
+        if cached is not None and cached[0] == self.revision:
+            return cached[1]
+        with self._timed(f"memo.{key[0] if isinstance(key, tuple) else key}"):
+            value = compute()
+        self._memo[key] = (self.revision, value)
+        return value
+
+    def maintenance(self, maint_type: str, create: bool = False) -> EventLog:
+        log = self._maintenance.get(maint_type)
+        if log is not None:
+            return log
+        entries = self.car.setdefault("maintenance", {})
+        if maint_type not in entries and not create:
+            return EventLog([])
+        log = self._maintenance[maint_type] = EventLog(entries.setdefault(maint_type, []))
+        return log
+
+    def maintenance_types(self) -> list[str]:
+        types = list(self.car.get("maintenance", {}))
+        if self.archive is not None:
+            types += [maint_type for maint_type in self.archive.types if maint_type not in types]
+        return types
+
+    def maintenance_count(self, maint_type: str) -> int:
+        archived = self.archive.maintenance_counts.get(maint_type, 0) if self.archive is not None else 0
+        return len(self.maintenance(maint_type)) + archived
+
+    def fuel_logs(self) -> list[ArchiveLog | FuelLog]:
+        """The fuel log split by tier, oldest first."""
+        return [self.archive.fuel, self.fuel] if self.archive is not None else [self.fuel]
+
+    def archived_counts(self) -> dict[str, int] | None:
+        """Number of archived entries per kind ("fuel" and "maintenance")."""
+        if self.archive is None:
+            return None
+        return {"fuel": len(self.archive.fuel), "maintenance": len(self.archive.maintenance)}
+
+    def archived_until(self, kind: str) -> int | None:
+        """Timestamp of the newest archived entry of kind ("fuel" or "maintenance")."""
+        if self.archive is None:
+            return None
+        return getattr(self.archive, kind).last_ts()
+
+    def archive_before(self, cutoff: int) -> int:
+        """Move entries older than cutoff to the archive; returns how many moved.
+
+        The last fill-ups needed for the recent average and the latest entry
+        of every maintenance type stay, whatever their age.
+        """
+        if self.archive is None:
+            return 0
+        keep = len(self.fuel) - FUEL_RECENT_FILLS - 1
+        fuel = self.fuel.split_head(max(min(self.fuel.position(cutoff), keep), 0))
+        logs = {maint_type: self.maintenance(maint_type) for maint_type in self.car.get("maintenance", {})}
+        latest = [log.latest()["ts"] for log in logs.values() if len(log)]
+        cut = min([cutoff, *latest])
+        maintenance = [
+            {**entry, "type": maint_type}
+            for maint_type, log in logs.items()
+            for entry in log.split_head(log.position(cut))
+        ]
+        maintenance.sort(key=_ts_key)
+        if not fuel and not maintenance:
+            return 0
+        self.archive.add(fuel, maintenance)
+        with self._timed("fuel_stats.rebuild"):
+            self.fuel_stats.rebuild()
+        self.bump()
+        return len(fuel) + len(maintenance)
+
+    def drop_archived(self) -> bool:
+        """Drop entries that are in the archive already, as left by an interrupted save."""
+        dropped = False
+        until = self.archived_until("fuel")
+        if until is not None and self.fuel.split_head(self.fuel.position(until + 1)):
+            dropped = True
+        until = self.archived_until("maintenance")
+        if until is not None:
+            for maint_type in self.car.get("maintenance", {}):
+                log = self.maintenance(maint_type)
+                if log.split_head(log.position(until + 1)):
+                    dropped = True
+        if dropped:
+            self.fuel_stats.rebuild()
+        return dropped
+
+    @property
+    def fuel_revision(self) -> int:
+        return self.car.get("meta", {}).get("fuel_revision", 0)
+
+    def _fuel_changed(self) -> None:
+        self.car.setdefault("meta", {})["fuel_revision"] = self.fuel_revision + 1
+
+    def add_fuel(self, entry: dict) -> None:
+        self.fuel_stats.add(entry)
+        self._fuel_changed()
+
+    def add_fuel_many(self, entries: list[dict]) -> None:
+        self.fuel.extend(entries)
+        with self._timed("fuel_stats.rebuild"):
+            self.fuel_stats.rebuild()
+        self._fuel_changed()
+
+    def update_fuel(self, ts: int | str, changes: dict) -> bool:
+        idx = self.fuel.index_of(ts)
+        if idx is None:
+            return False
+        self.fuel_stats.update(idx, changes)
+        self._fuel_changed()
+        return True
+
+    def delete_fuel(self, ts: int | str) -> bool:
+        idx = self.fuel.index_of(ts)
+        if idx is None:
+            return False
+        self.fuel_stats.remove(idx)
+        self._fuel_changed()
+        return True
+
+    def add_maintenance(self, maint_type: str, entry: dict) -> None:
+        self.maintenance(maint_type, create=True).insert(entry)
+
+    def add_maintenance_many(self, maint_type: str, entries: list[dict]) -> None:
+        self.maintenance(maint_type, create=True).extend(entries)
+
+    def update_maintenance(self, maint_type: str, ts: int | str, changes: dict) -> bool:
+        log = self.maintenance(maint_type)
+        idx = log.index_of(ts)
+        if idx is None:
+            return False
+        log.update(idx, changes)
+        return True
+
+    def delete_maintenance(self, maint_type: str, ts: int | str) -> bool:
+        log = self.maintenance(maint_type)
+        idx = log.index_of(ts)
+        if idx is None:
+            return False
+        log.pop(idx)
+        return True
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import datetime as dt
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.event import async_track_point_in_utc_time
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+from .maintenance import DueIndex, get_maintenance_due, maintenance_types
+
+
+def signal_maintenance_due(car_id: str, maint_type: str) -> str:
+    return f"{DOMAIN}_{car_id}_maintenance_{maint_type}_due"
+
+
+class MaintenanceScheduler:
+    """Wakes a maintenance due sensor at the moment it becomes due by date.
+
+    Keeps one timer per car and maintenance type for the next due instant;
+    timers are only replaced when that instant changes. The same updates
+    keep the fleet-wide DueIndex behind carlog.get_due_soon current.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+        self._timers: dict[tuple[str, str], tuple[dt.datetime, CALLBACK_TYPE]] = {}
+        self.due_index = DueIndex()
+
+    @callback
+    def async_reschedule(self, car_id: str) -> None:
+        repo = self.hass.data[DOMAIN]["storage"].repository(car_id)
+        meta = repo.car.get("meta", {})
+        for maint_type in maintenance_types(meta):
+            due, due_dt = get_maintenance_due(repo, maint_type)
+            self.due_index.update(car_id, meta.get("name", car_id), maint_type, due, due_dt)
+            self._schedule(car_id, maint_type, due_dt)
+
+    def _schedule(self, car_id: str, maint_type: str, due_dt: dt.datetime | None) -> None:
+        key = (car_id, maint_type)
+        current = self._timers.get(key)
+        if current is not None:
+            if current[0] == due_dt:
+                return
+            current[1]()
+            del self._timers[key]
+
+        if due_dt is None or due_dt <= dt_util.utcnow():
+            # Already due (or no date rule): the sensor reports it on read
+            return
+
+        @callback
+        def _fire(_now: dt.datetime) -> None:
+            self._timers.pop(key, None)
+            async_dispatcher_send(self.hass, signal_maintenance_due(car_id, maint_type))
+
+        self._timers[key] = (due_dt, async_track_point_in_utc_time(self.hass, _fire, due_dt))
+
+    @callback
+    def async_remove_car(self, car_id: str) -> None:
+        self.due_index.remove_car(car_id)
+        for key in [key for key in self._timers if key[0] == car_id]:
+            self._timers.pop(key)[1]()
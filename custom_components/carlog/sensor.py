@@ -1,83 +1,31 @@
 from __future__ import annotations
 
-import datetime as dt
-
 from homeassistant.components.sensor import SensorEntity
-from homeassistant.const import UnitOfLength, UnitOfVolume
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.const import EntityCategory, UnitOfLength, UnitOfVolume
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from .const import DOMAIN
-from .__init__ import SIGNAL_UPDATED
-
-
-def _fuel_stats(fuel_logs: list[dict]) -> dict:
-    if len(fuel_logs) < 2:
-        return {"avg_l_per_100km": None, "last": fuel_logs[-1] if fuel_logs else None}
-
-    logs = sorted(fuel_logs, key=lambda x: x.get("ts", ""))
-    total_l = 0.0
-    total_km = 0.0
-
-    for prev, cur in zip(logs[:-1], logs[1:]):
-        dk = float(cur.get("odometer_km", 0)) - float(prev.get("odometer_km", 0))
-        if dk <= 0:
-            continue
-        total_km += dk
-        total_l += float(cur.get("liters", 0))
-
-    avg = (total_l / total_km * 100.0) if total_km > 0 else None
-    return {"avg_l_per_100km": avg, "last": logs[-1]}
-
-
-def _last_maintenance(maint_logs: list[dict]) -> dict | None:
-    if not maint_logs:
-        return None
-    logs = sorted(maint_logs, key=lambda x: x.get("ts", ""))
-    return logs[-1]
-
-
-def _parse_ts(ts: str) -> dt.datetime:
-    return dt.datetime.fromisoformat(ts.replace("Z", "+00:00"))
-
-
-def _maintenance_due(meta: dict, maint_type: str, maint_logs: list[dict], odometer_km: float | None) -> dict:
-    defaults = meta.get("maintenance_defaults", {})
-    rule = defaults.get(maint_type, {})
-    interval_km = rule.get("interval_km")
-    interval_days = rule.get("interval_days")
-
-    last = _last_maintenance(maint_logs)
-    now = dt.datetime.now(dt.timezone.utc)
-
-    due_km = None
-    due_date = None
-    is_due = False
-
-    if last and interval_km is not None and odometer_km is not None:
-        due_at_km = float(last.get("odometer_km", 0)) + float(interval_km)
-        due_km = max(0.0, due_at_km - float(odometer_km))
-        if float(odometer_km) >= due_at_km:
-            is_due = True
+from .const import (
+    DOMAIN,
+    FUEL_RECENT_FILLS,
+    FUEL_WINDOW_DAYS,
+    KIND_FUEL,
+    KIND_MAINTENANCE,
+    KIND_META,
+    KIND_RUNTIME,
+    MONTHS_SHOWN,
+)
+from .__init__ import async_connect_car, async_write_if_changed, get_repository
+from .instrumentation import Histogram, get_instrumentation
+from .maintenance import due_now, get_maintenance_due
+from .scheduler import signal_maintenance_due
+from .stats import FuelBucket
+from .timestamps import month_of, now_us, to_iso
 
-    if last and interval_days is not None:
-        last_dt = _parse_ts(last["ts"])
-        due_dt = last_dt + dt.timedelta(days=int(interval_days))
-        due_date = due_dt.date().isoformat()
-        if now >= due_dt:
-            is_due = True
 
-    return {
-        "is_due": is_due,
-        "km_remaining": due_km,
-        "due_date": due_date,
-        "last_done_km": last.get("odometer_km") if last else None,
-        "last_done_ts": last.get("ts") if last else None,
-        "label": rule.get("label", maint_type),
-        "interval_km": interval_km,
-        "interval_days": interval_days,
-    }
+def _consumption_attrs(bucket: FuelBucket) -> dict:
+    return {"km": round(bucket.km, 1), "liters": round(bucket.liters, 2), "tankbeurten": bucket.fills}
 
 
 async def async_setup_entry(hass: HomeAssistant, entry, async_add_entities: AddEntitiesCallback) -> None:
@@ -88,19 +36,34 @@ async def async_setup_entry(hass: HomeAssistant, entry, async_add_entities: AddE
         [
             CarOdometerSensor(hass, car_id, name),
             CarFuelAvgSensor(hass, car_id, name),
+            CarFuelRecentAvgSensor(hass, car_id, name),
+            CarFuelWindowAvgSensor(hass, car_id, name),
+            CarFuelMonthSensor(hass, car_id, name),
+            CarFuelSpendSensor(hass, car_id, name),
+            CarFuelSpendMonthSensor(hass, car_id, name),
+            CarFuelPricePerLiterSensor(hass, car_id, name),
+            CarFuelCostPer100Sensor(hass, car_id, name),
             CarEstimatedRangeSensor(hass, car_id, name),
             CarLastFuelSensor(hass, car_id, name),
             CarSaveStatusSensor(hass, car_id, name),
             CarMaintenanceDueSensor(hass, car_id, name, "oil"),
             CarMaintenanceDueSensor(hass, car_id, name, "tires"),
             CarMaintenanceDueSensor(hass, car_id, name, "brakes"),
+            CarTimingSensor(hass, car_id, name, "service", "Service duur", ("service.",)),
+            CarTimingSensor(hass, car_id, name, "store_save", "Opslaan duur", ("store.",)),
+            CarTimingSensor(
+                hass, car_id, name, "recompute", "Herberekening duur", ("memo.", "fuel_stats.", "entity.")
+            ),
+            CarDispatchSensor(hass, car_id, name),
         ],
-        update_before_add=True,
     )
 
 
 class _CarBaseSensor(SensorEntity):
     _attr_has_entity_name = True
+    _attr_should_poll = False
+    _signal_kinds: tuple[str, ...] = ()
+    _last_written: tuple | None = None
 
     def __init__(self, hass: HomeAssistant, car_id: str, car_name: str):
         self.hass = hass
@@ -119,19 +82,21 @@ class _CarBaseSensor(SensorEntity):
         )
 
     async def async_added_to_hass(self) -> None:
-        self._unsub = async_dispatcher_connect(self.hass, SIGNAL_UPDATED, self._handle_update)
+        self._unsub = async_connect_car(self.hass, self.car_id, self._signal_kinds, self._handle_update)
 
     async def async_will_remove_from_hass(self) -> None:
         if self._unsub:
             self._unsub()
 
+    @callback
     def _handle_update(self) -> None:
-        self.async_write_ha_state()
+        async_write_if_changed(self)
 
 
 class CarOdometerSensor(_CarBaseSensor):
     _attr_icon = "mdi:speedometer"
     _attr_native_unit_of_measurement = UnitOfLength.KILOMETERS
+    _signal_kinds = (KIND_META,)
 
     def __init__(self, hass, car_id, car_name):
         super().__init__(hass, car_id, car_name)
@@ -147,6 +112,7 @@ class CarOdometerSensor(_CarBaseSensor):
 class CarFuelAvgSensor(_CarBaseSensor):
     _attr_icon = "mdi:gas-station"
     _attr_native_unit_of_measurement = "L/100km"
+    _signal_kinds = (KIND_FUEL,)
 
     def __init__(self, hass, car_id, car_name):
         super().__init__(hass, car_id, car_name)
@@ -155,49 +121,199 @@ class CarFuelAvgSensor(_CarBaseSensor):
 
     @property
     def native_value(self):
-        car = self._get_car()
-        stats = _fuel_stats(car.get("fuel", []))
-        avg = stats["avg_l_per_100km"]
+        avg = get_repository(self.hass, self.car_id).fuel_stats.avg_l_per_100km
         return round(avg, 2) if avg is not None else None
 
     @property
     def extra_state_attributes(self):
-        car = self._get_car()
-        return {"tankbeurten": len(car.get("fuel", []))}
+        return {"tankbeurten": get_repository(self.hass, self.car_id).fuel_stats.count}
+
+
+class CarFuelRecentAvgSensor(_CarBaseSensor):
+    _attr_icon = "mdi:gas-station"
+    _attr_native_unit_of_measurement = "L/100km"
+    _signal_kinds = (KIND_FUEL,)
+
+    def __init__(self, hass, car_id, car_name):
+        super().__init__(hass, car_id, car_name)
+        self._attr_name = f"Verbruik laatste {FUEL_RECENT_FILLS} tankbeurten"
+        self._attr_unique_id = f"{car_id}_fuel_avg_recent"
+
+    def _recent(self) -> FuelBucket:
+        repo = get_repository(self.hass, self.car_id)
+        return repo.memo("fuel_recent", lambda: repo.fuel_stats.recent(FUEL_RECENT_FILLS))
+
+    @property
+    def native_value(self):
+        avg = self._recent().l_per_100km
+        return round(avg, 2) if avg is not None else None
+
+    @property
+    def extra_state_attributes(self):
+        return _consumption_attrs(self._recent())
+
+
+class CarFuelWindowAvgSensor(_CarBaseSensor):
+    _attr_icon = "mdi:gas-station"
+    _attr_native_unit_of_measurement = "L/100km"
+    _signal_kinds = (KIND_FUEL,)
+    # Follows the clock as well, so still polled
+    _attr_should_poll = True
+
+    def __init__(self, hass, car_id, car_name):
+        super().__init__(hass, car_id, car_name)
+        self._attr_name = f"Verbruik laatste {FUEL_WINDOW_DAYS} dagen"
+        self._attr_unique_id = f"{car_id}_fuel_avg_{FUEL_WINDOW_DAYS}d"
+
+    def _window(self) -> FuelBucket:
+        # Depends on the clock, so not memoized; only the window is summed
+        since = now_us() - FUEL_WINDOW_DAYS * 86_400_000_000
+        return get_repository(self.hass, self.car_id).fuel_stats.since(since)
+
+    @property
+    def native_value(self):
+        avg = self._window().l_per_100km
+        return round(avg, 2) if avg is not None else None
+
+    @property
+    def extra_state_attributes(self):
+        return _consumption_attrs(self._window())
+
+
+class CarFuelMonthSensor(_CarBaseSensor):
+    _attr_icon = "mdi:calendar-month"
+    _attr_native_unit_of_measurement = "L/100km"
+    _signal_kinds = (KIND_FUEL,)
+    # Follows the clock as well, so still polled
+    _attr_should_poll = True
+    _unrecorded_attributes = frozenset({"maanden"})
+
+    def __init__(self, hass, car_id, car_name):
+        super().__init__(hass, car_id, car_name)
+        self._attr_name = "Verbruik deze maand"
+        self._attr_unique_id = f"{car_id}_fuel_avg_month"
+
+    def _months(self) -> dict:
+        repo = get_repository(self.hass, self.car_id)
+
+        def compute():
+            months = repo.fuel_stats.months
+            return {month: months[month].as_dict() for month in sorted(months)[-MONTHS_SHOWN:]}
+
+        return repo.memo("fuel_months", compute)
+
+    @property
+    def native_value(self):
+        month = self._months().get(month_of(now_us()))
+        return month["l_per_100km"] if month else None
+
+    @property
+    def extra_state_attributes(self):
+        return {"maanden": self._months()}
+
+
+class CarFuelSpendSensor(_CarBaseSensor):
+    _attr_icon = "mdi:cash"
+    _attr_native_unit_of_measurement = "EUR"
+    _signal_kinds = (KIND_FUEL,)
+
+    def __init__(self, hass, car_id, car_name):
+        super().__init__(hass, car_id, car_name)
+        self._attr_name = "Brandstofkosten totaal"
+        self._attr_unique_id = f"{car_id}_fuel_spend"
+
+    @property
+    def native_value(self):
+        total = get_repository(self.hass, self.car_id).fuel_stats.total
+        return round(total.spend, 2) if total.priced_fills else None
+
+    @property
+    def extra_state_attributes(self):
+        total = get_repository(self.hass, self.car_id).fuel_stats.total
+        # Fill-ups without price_total are left out of all cost figures
+        return {"tankbeurten_met_prijs": total.priced_fills, "tankbeurten": total.fills}
+
+
+class CarFuelSpendMonthSensor(_CarBaseSensor):
+    _attr_icon = "mdi:cash-clock"
+    _attr_native_unit_of_measurement = "EUR"
+    _signal_kinds = (KIND_FUEL,)
+    # Follows the clock as well, so still polled
+    _attr_should_poll = True
+
+    def __init__(self, hass, car_id, car_name):
+        super().__init__(hass, car_id, car_name)
+        self._attr_name = "Brandstofkosten deze maand"
+        self._attr_unique_id = f"{car_id}_fuel_spend_month"
+
+    @property
+    def native_value(self):
+        months = get_repository(self.hass, self.car_id).fuel_stats.months
+        bucket = months.get(month_of(now_us()))
+        # Like the total: no priced fill-up means no value, not zero spend
+        return round(bucket.spend, 2) if bucket is not None and bucket.priced_fills else None
+
+
+class CarFuelPricePerLiterSensor(_CarBaseSensor):
+    _attr_icon = "mdi:currency-eur"
+    _attr_native_unit_of_measurement = "EUR/L"
+    _signal_kinds = (KIND_FUEL,)
+
+    def __init__(self, hass, car_id, car_name):
+        super().__init__(hass, car_id, car_name)
+        self._attr_name = "Gemiddelde literprijs"
+        self._attr_unique_id = f"{car_id}_fuel_price_per_liter"
+
+    @property
+    def native_value(self):
+        price = get_repository(self.hass, self.car_id).fuel_stats.total.price_per_liter
+        return round(price, 3) if price is not None else None
+
+
+class CarFuelCostPer100Sensor(_CarBaseSensor):
+    _attr_icon = "mdi:cash-multiple"
+    _attr_native_unit_of_measurement = "EUR/100km"
+    _signal_kinds = (KIND_FUEL,)
+
+    def __init__(self, hass, car_id, car_name):
+        super().__init__(hass, car_id, car_name)
+        self._attr_name = "Kosten per 100 km"
+        self._attr_unique_id = f"{car_id}_fuel_cost_per_100km"
+
+    @property
+    def native_value(self):
+        cost = get_repository(self.hass, self.car_id).fuel_stats.total.cost_per_100km
+        return round(cost, 2) if cost is not None else None
 
 
 class CarEstimatedRangeSensor(_CarBaseSensor):
     _attr_icon = "mdi:map-marker-distance"
     _attr_native_unit_of_measurement = UnitOfLength.KILOMETERS
+    _signal_kinds = (KIND_FUEL, KIND_META)
+    _unrecorded_attributes = frozenset({"tank_capacity_l", "avg_l_per_100km", "formula"})
 
     def __init__(self, hass, car_id, car_name):
         super().__init__(hass, car_id, car_name)
         self._attr_name = "Gemiddelde actieradius"
         self._attr_unique_id = f"{car_id}_range_estimated"
 
-    @property
-    def native_value(self):
-        car = self._get_car()
-        meta = car.get("meta", {})
-        cap = meta.get("tank_capacity_l")
-        if cap is None:
-            return None
+    def _range(self) -> tuple[float | None, float | None, float | None]:
+        def compute():
+            cap = self._get_car().get("meta", {}).get("tank_capacity_l")
+            avg = get_repository(self.hass, self.car_id).fuel_stats.avg_l_per_100km
+            if cap is None or avg is None or avg <= 0:
+                return cap, avg, None
+            return cap, avg, round(float(cap) * 100.0 / float(avg), 0)
 
-        stats = _fuel_stats(car.get("fuel", []))
-        avg = stats["avg_l_per_100km"]
-        if avg is None or avg <= 0:
-            return None
+        return get_repository(self.hass, self.car_id).memo("range", compute)
 
-        rng = float(cap) * 100.0 / float(avg)
-        return round(rng, 0)
+    @property
+    def native_value(self):
+        return self._range()[2]
 
     @property
     def extra_state_attributes(self):
-        car = self._get_car()
-        meta = car.get("meta", {})
-        cap = meta.get("tank_capacity_l")
-        stats = _fuel_stats(car.get("fuel", []))
-        avg = stats["avg_l_per_100km"]
+        cap, avg, _ = self._range()
         return {
             "tank_capacity_l": cap,
             "avg_l_per_100km": round(avg, 2) if avg is not None else None,
@@ -208,6 +324,7 @@ class CarEstimatedRangeSensor(_CarBaseSensor):
 class CarLastFuelSensor(_CarBaseSensor):
     _attr_icon = "mdi:receipt"
     _attr_native_unit_of_measurement = UnitOfVolume.LITERS
+    _signal_kinds = (KIND_FUEL,)
 
     def __init__(self, hass, car_id, car_name):
         super().__init__(hass, car_id, car_name)
@@ -216,27 +333,27 @@ class CarLastFuelSensor(_CarBaseSensor):
 
     @property
     def native_value(self):
-        car = self._get_car()
-        stats = _fuel_stats(car.get("fuel", []))
-        last = stats["last"]
+        last = get_repository(self.hass, self.car_id).fuel_stats.last
         return round(float(last.get("liters", 0)), 2) if last else None
 
     @property
     def extra_state_attributes(self):
-        car = self._get_car()
-        stats = _fuel_stats(car.get("fuel", []))
-        last = stats["last"]
+        last = get_repository(self.hass, self.car_id).fuel_stats.last
         if not last:
             return {}
         return {
             "odometer_km": last.get("odometer_km"),
-            "ts": last.get("ts"),
+            "ts": to_iso(last["ts"]),
             "price_total": last.get("price_total"),
         }
 
 
 class CarMaintenanceDueSensor(_CarBaseSensor):
     _attr_icon = "mdi:wrench"
+    _signal_kinds = (KIND_MAINTENANCE, KIND_META)
+    _unrecorded_attributes = frozenset(
+        {"km_remaining", "last_done_ts", "label", "interval_km", "interval_days"}
+    )
 
     def __init__(self, hass, car_id, car_name, maint_type: str):
         super().__init__(hass, car_id, car_name)
@@ -244,26 +361,32 @@ class CarMaintenanceDueSensor(_CarBaseSensor):
         self._attr_name = f"{maint_type} onderhoud due"
         self._attr_unique_id = f"{car_id}_maint_due_{maint_type}"
 
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        # Woken by the scheduler when the due date passes without any change
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass, signal_maintenance_due(self.car_id, self.maint_type), self._handle_update
+            )
+        )
+
+    def _due(self) -> dict:
+        repo = get_repository(self.hass, self.car_id)
+        return due_now(*get_maintenance_due(repo, self.maint_type))
+
     @property
     def native_value(self):
-        car = self._get_car()
-        meta = car.get("meta", {})
-        odometer_km = meta.get("odometer_km")
-        maint_logs = car.get("maintenance", {}).get(self.maint_type, [])
-        due = _maintenance_due(meta, self.maint_type, maint_logs, odometer_km)
-        return due["is_due"]
+        return self._due()["is_due"]
 
     @property
     def extra_state_attributes(self):
-        car = self._get_car()
-        meta = car.get("meta", {})
-        odometer_km = meta.get("odometer_km")
-        maint_logs = car.get("maintenance", {}).get(self.maint_type, [])
-        return _maintenance_due(meta, self.maint_type, maint_logs, odometer_km)
+        return self._due()
 
 
 class CarSaveStatusSensor(_CarBaseSensor):
     _attr_icon = "mdi:information-outline"
+    _signal_kinds = (KIND_RUNTIME,)
+    _unrecorded_attributes = frozenset({"message", "ts"})
 
     def __init__(self, hass, car_id, car_name):
         super().__init__(hass, car_id, car_name)
@@ -281,3 +404,64 @@ class CarSaveStatusSensor(_CarBaseSensor):
     def extra_state_attributes(self):
         rt = self._rt()
         return {"message": rt.get("message", ""), "ts": rt.get("ts")}
+
+
+class _CarDiagnosticSensor(_CarBaseSensor):
+    """Instrumentation of the car; off by default and polled instead of signalled."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_should_poll = True
+
+    async def async_added_to_hass(self) -> None:
+        pass
+
+
+class CarTimingSensor(_CarDiagnosticSensor):
+    _attr_icon = "mdi:timer-outline"
+    _attr_native_unit_of_measurement = "ms"
+    _unrecorded_attributes = frozenset({"timings"})
+
+    def __init__(self, hass, car_id, car_name, key: str, label: str, prefixes: tuple[str, ...]):
+        super().__init__(hass, car_id, car_name)
+        self.prefixes = prefixes
+        self._attr_name = f"{label} p95"
+        self._attr_unique_id = f"{car_id}_diag_{key}_p95"
+
+    def _histograms(self) -> dict[str, Histogram]:
+        instrumentation = get_instrumentation(self.hass)
+        histograms = {}
+        for prefix in self.prefixes:
+            histograms.update(instrumentation.histograms(self.car_id, prefix))
+        return histograms
+
+    @property
+    def native_value(self):
+        combined = Histogram()
+        for histogram in self._histograms().values():
+            if not histogram.is_size:
+                combined.merge(histogram)
+        p95 = combined.percentile(0.95)
+        return round(p95 * 1000, 3) if p95 is not None else None
+
+    @property
+    def extra_state_attributes(self):
+        return {"timings": {name: histogram.summary() for name, histogram in sorted(self._histograms().items())}}
+
+
+class CarDispatchSensor(_CarDiagnosticSensor):
+    _attr_icon = "mdi:broadcast"
+    _unrecorded_attributes = frozenset({"dispatch"})
+
+    def __init__(self, hass, car_id, car_name):
+        super().__init__(hass, car_id, car_name)
+        self._attr_name = "Signalen"
+        self._attr_unique_id = f"{car_id}_diag_dispatch"
+
+    @property
+    def native_value(self):
+        return sum(counts["sends"] for counts in get_instrumentation(self.hass).dispatch(self.car_id).values())
+
+    @property
+    def extra_state_attributes(self):
+        return {"dispatch": get_instrumentation(self.hass).dispatch(self.car_id)}
@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from .timestamps import month_bounds, month_of, to_us
+
+if TYPE_CHECKING:
+    from .archive import CarArchive
+    from .columns import FuelLog
+
+
+def _pair(prev: dict, cur: dict) -> tuple[float, float]:
+    """Distance and liters contributed by two consecutive fill-ups."""
+    dk = float(cur.get("odometer_km", 0)) - float(prev.get("odometer_km", 0))
+    if dk <= 0:
+        return 0.0, 0.0
+    return dk, float(cur.get("liters", 0))
+
+
+def _price(entry: dict) -> float | None:
+    price = entry.get("price_total")
+    return float(price) if price is not None else None
+
+
+def _month(entry: dict) -> str:
+    return month_of(entry["ts"])
+
+
+def consumption(km: float, liters: float) -> float | None:
+    return liters / km * 100.0 if km > 0 else None
+
+
+def _round(value: float | None, digits: int) -> float | None:
+    return round(value, digits) if value is not None else None
+
+
+class FuelBucket:
+    """Fuel and cost sums over a set of fill-ups.
+
+    Costs only include fill-ups with a price_total: spend and priced_liters
+    per fill-up, priced_km/priced_cost per pair whose later fill-up is priced.
+    """
+
+    __slots__ = ("km", "liters", "fills", "spend", "priced_liters", "priced_fills", "priced_km", "priced_cost")
+
+    def __init__(self) -> None:
+        self.km = self.liters = 0.0
+        self.spend = self.priced_liters = self.priced_km = self.priced_cost = 0.0
+        self.fills = self.priced_fills = 0
+
+    def add_fill(self, entry: dict, sign: int) -> None:
+        self.fills += sign
+        price = _price(entry)
+        if price is not None:
+            self.priced_fills += sign
+            self.spend += sign * price
+            self.priced_liters += sign * float(entry.get("liters", 0))
+
+    def add_pair(self, prev: dict, cur: dict, sign: int) -> None:
+        dk, liters = _pair(prev, cur)
+        self.km += sign * dk
+        self.liters += sign * liters
+        price = _price(cur)
+        if price is not None and dk > 0:
+            self.priced_km += sign * dk
+            self.priced_cost += sign * price
+
+    def merge(self, other: FuelBucket) -> None:
+        for field in self.__slots__:
+            setattr(self, field, getattr(self, field) + getattr(other, field))
+
+    def to_list(self) -> list:
+        """Raw sums in slot order, as persisted in a car summary."""
+        return [getattr(self, field) for field in self.__slots__]
+
+    @classmethod
+    def from_list(cls, values: list) -> FuelBucket:
+        bucket = cls()
+        for field, value in zip(cls.__slots__, values):
+            setattr(bucket, field, value)
+        return bucket
+
+    @property
+    def l_per_100km(self) -> float | None:
+        return consumption(self.km, self.liters)
+
+    @property
+    def price_per_liter(self) -> float | None:
+        return self.spend / self.priced_liters if self.priced_liters > 0 else None
+
+    @property
+    def cost_per_100km(self) -> float | None:
+        return self.priced_cost / self.priced_km * 100.0 if self.priced_km > 0 else None
+
+    def as_dict(self) -> dict:
+        return {
+            "km": round(self.km, 1),
+            "liters": round(self.liters, 2),
+            "fills": self.fills,
+            "l_per_100km": _round(self.l_per_100km, 2),
+            "spend": round(self.spend, 2),
+            "priced_fills": self.priced_fills,
+            "price_per_liter": _round(self.price_per_liter, 3),
+            "cost_per_100km": _round(self.cost_per_100km, 2),
+        }
+
+
+def sum_entries(entries: list[dict]) -> FuelBucket:
+    """Bucket over consecutive entries; the first one only opens the first pair."""
+    bucket = FuelBucket()
+    for prev, cur in zip(entries[:-1], entries[1:]):
+        bucket.add_fill(cur, 1)
+        bucket.add_pair(prev, cur, 1)
+    return bucket
+
+
+class FuelStats:
+    """Running fuel aggregate of one car.
+
+    Every mutation of the (sorted) fuel log goes through this class, so only
+    the months around the touched entry are recomputed. Besides the lifetime
+    totals it keeps a FuelBucket per month; a pair counts towards the month
+    of its later fill-up.
+
+    With an archive the sums start from those of the archived fill-ups, and
+    the last archived fill-up (the anchor) opens the pair to the oldest one
+    in ``fuel``. Archived fill-ups never change.
+    """
+
+    def __init__(self, fuel: FuelLog, archive: CarArchive | None = None) -> None:
+        self.fuel = fuel
+        self.archive = archive
+        self.rebuild()
+
+    def rebuild(self) -> None:
+        self.total, self.months = self.fuel.aggregate()
+        self._anchor = self.archive.fuel.latest() if self.archive is not None else None
+        if self._anchor is not None:
+            self.total.merge(self.archive.fuel_total)
+            for month, archived in self.archive.fuel_months.items():
+                bucket = self.months.get(month)
+                if bucket is None:
+                    bucket = self.months[month] = FuelBucket()
+                bucket.merge(archived)
+            if len(self.fuel):
+                # The pair of the anchor and the oldest fill-up in ``fuel``
+                month = _month(self.fuel[0])
+                self.months[month] = self._month_bucket(month)
+        self._sum_months()
+
+    @property
+    def count(self) -> int:
+        archived = len(self.archive.fuel) if self.archive is not None else 0
+        return len(self.fuel) + archived
+
+    @property
+    def last(self) -> dict | None:
+        return self.fuel.latest() or self._anchor
+
+    def entries_from(self, lo: int) -> list[dict]:
+        """Fill-ups from index lo of ``fuel`` on; negative indexes reach into the archive."""
+        if lo < 0 and self._anchor is not None:
+            archived = self.archive.fuel
+            head = [archived[idx] for idx in range(max(len(archived) + lo, 0), len(archived))]
+            return head + self.fuel.slice(0)
+        return self.fuel.slice(max(lo, 0))
+
+    def index_before(self, ts: int) -> int:
+        """Index (as taken by ``entries_from``) of the last fill-up before ts."""
+        idx = self.fuel.position(ts)
+        if idx == 0 and self._anchor is not None:
+            return self.archive.fuel.position(ts) - len(self.archive.fuel) - 1
+        return idx - 1
+
+    @property
+    def avg_l_per_100km(self) -> float | None:
+        if self.count < 2:
+            return None
+        return self.total.l_per_100km
+
+    def recent(self, fills: int) -> FuelBucket:
+        """Sums over the last `fills` fill-ups."""
+        return sum_entries(self.entries_from(len(self.fuel) - fills - 1))
+
+    def since(self, ts: int) -> FuelBucket:
+        """Sums over the fill-ups at or after ts."""
+        return sum_entries(self.entries_from(self.index_before(ts)))
+
+    def _month_bucket(self, month: str) -> FuelBucket:
+        """The bucket of one month, summed from its fill-ups."""
+        start, end = month_bounds(month)
+        lo, hi = self.fuel.position(start), self.fuel.position(end)
+        bucket = FuelBucket()
+        if self._anchor is not None and month in self.archive.fuel_months:
+            bucket.merge(self.archive.fuel_months[month])
+        if lo == hi:
+            return bucket
+        prev = self.fuel[lo - 1] if lo > 0 else self._anchor
+        for entry in self.fuel.slice(lo, hi):
+            bucket.add_fill(entry, 1)
+            if prev is not None:
+                bucket.add_pair(prev, entry, 1)
+            prev = entry
+        return bucket
+
+    def _refresh(self, *indexes: int) -> None:
+        """Recompute the months of the fill-ups at indexes (pairs count towards their later fill-up).
+
+        Months are summed from their entries instead of adjusted by deltas,
+        so a month without pairs is exactly zero and no rounding error
+        accumulates; the lifetime total is the sum of the months.
+        """
+        for month in {_month(self.fuel[idx]) for idx in indexes if 0 <= idx < len(self.fuel)}:
+            bucket = self._month_bucket(month)
+            if bucket.fills:
+                self.months[month] = bucket
+            else:
+                self.months.pop(month, None)
+        self._sum_months()
+
+    def _sum_months(self) -> None:
+        self.total = FuelBucket()
+        for bucket in self.months.values():
+            self.total.merge(bucket)
+
+    def add(self, entry: dict) -> None:
+        idx = self.fuel.insert(entry)
+        self._refresh(idx, idx + 1)
+
+    def update(self, idx: int, changes: dict) -> None:
+        if "ts" in changes and to_us(changes["ts"]) != self.fuel[idx]["ts"]:
+            # Moves the entry: handle as a removal and a new fill-up
+            entry = self.remove(idx)
+            entry.update(changes)
+            self.add(entry)
+            return
+        self.fuel.update(idx, changes)
+        self._refresh(idx, idx + 1)
+
+    def remove(self, idx: int) -> dict:
+        entry = self.fuel.pop(idx)
+        month = _month(entry)
+        # The month of the removed entry may have no fill-ups left
+        self.months.pop(month, None)
+        bucket = self._month_bucket(month)
+        if bucket.fills:
+            self.months[month] = bucket
+        self._refresh(idx)
+        return entry
@@ -0,0 +1,650 @@
+from __future__ import annotations
+
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import os
+import time
+from functools import partial
+
+from homeassistant.const import EVENT_HOMEASSISTANT_FINAL_WRITE
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.start import async_at_started
+from homeassistant.helpers.storage import Store
+from homeassistant.util import slugify
+
+from .const import (
+    DEFAULT_SAVE_DELAY,
+    JOURNAL_MAX_BYTES,
+    JOURNAL_MAX_ENTRIES,
+    MIGRATE_CHUNK_ENTRIES,
+    STORAGE_KEY,
+    STORAGE_KEY_INDEX,
+    STORAGE_KEY_UI,
+    STORAGE_VERSION,
+)
+from .archive import CarArchive
+from .columns import FuelLog
+from .events import apply_event
+from .instrumentation import get_instrumentation
+from .journal import CarJournal
+from .repository import CarRepository
+from .summary import CarSummary, file_stamp, is_current, summarize
+from .timestamps import now_us, to_us
+
+_LOGGER = logging.getLogger(__name__)
+
+# Retention is set in years; a year of 365.25 days in µs
+_YEAR_US = 31_557_600_000_000
+
+
+def _new_car() -> dict:
+    return {"fuel": [], "maintenance": {}, "meta": {}, "ui": {}}
+
+
+class CarLogStore(Store):
+    """Store that migrates older CarLog files to the current schema on load.
+
+    ``migrated`` is set when the file was converted, so the caller can write
+    it back once instead of converting it again on every start.
+    """
+
+    migrated = False
+
+    async def _async_migrate_func(self, old_major_version: int, old_minor_version: int, old_data: dict) -> dict:
+        if old_major_version < 2:
+            if "cars" in old_data:
+                # Single-file layout, the index or the drafts: only cars with history change
+                for car in old_data["cars"].values():
+                    if isinstance(car, dict) and ("fuel" in car or "maintenance" in car):
+                        await _async_migrate_car_v2(car)
+            else:
+                await _async_migrate_car_v2(old_data)
+        self.migrated = True
+        return old_data
+
+
+async def _async_timestamps_to_us(entries: list[dict], what: str) -> list[dict]:
+    """Convert ISO timestamps in place, a chunk at a time, and sort on them."""
+    valid = []
+    for start in range(0, len(entries), MIGRATE_CHUNK_ENTRIES):
+        for entry in entries[start : start + MIGRATE_CHUNK_ENTRIES]:
+            try:
+                entry["ts"] = to_us(entry["ts"])
+            except (KeyError, TypeError, ValueError):
+                _LOGGER.warning("Dropping %s entry without a valid timestamp: %s", what, entry)
+                continue
+            valid.append(entry)
+        # Large histories should not block the event loop for the whole conversion
+        await asyncio.sleep(0)
+    valid.sort(key=lambda entry: entry["ts"])
+    return valid
+
+
+async def _async_migrate_car_v2(car: dict) -> None:
+    """Version 1 -> 2: integer timestamps and the fuel log as columns."""
+    fuel = car.get("fuel")
+    if isinstance(fuel, list):
+        car["fuel"] = FuelLog.from_entries(await _async_timestamps_to_us(fuel, "fuel")).to_columns()
+    maintenance = car.get("maintenance", {})
+    for maint_type, entries in maintenance.items():
+        maintenance[maint_type] = await _async_timestamps_to_us(entries, maint_type)
+    published = car.get("meta", {}).get("statistics")
+    if published and isinstance(published.get("last_ts"), str):
+        published["last_ts"] = to_us(published["last_ts"])
+
+
+class CarLogStorage:
+    """Write-behind persistence for the CarLog data.
+
+    Every car lives in its own store file (shard), listed in a small index
+    file. Shards are loaded on demand, and only the shards of cars that
+    changed are written. A burst of changes within the delay window results
+    in a single write, and a shard is skipped when its serialized content
+    did not change since the last write.
+
+    The draft input values (``car["ui"]``) are kept out of the shards in a
+    small state file per car (``<shard>.state``), so editing an input never
+    rewrites history, nor the drafts of the other cars. The marker of what
+    was published as long-term statistics lives there too.
+
+    History events are appended to a per-car journal instead of rewriting
+    the shard. The journal is replayed on top of the shard when the car is
+    loaded, and folded into a new shard snapshot once it grows too large.
+
+    While Home Assistant is starting, writes are held back: whatever the
+    config entries changed is written in one flush once it has started.
+
+    The state file of a car also keeps its summary (see ``summarize``), so
+    the index only lists the cars and a save of one car costs the same
+    whatever the size of the fleet. Setting up a car only needs that
+    summary, as long as neither its journal nor its shard changed since the
+    summary was written; the history itself is loaded on first use.
+    Summaries are refreshed with every shard write and at shutdown.
+
+    A car with a retention (meta "retention_years") moves older entries to
+    its archive (see ``CarArchive``) before its shard is written. The
+    archive is written first, so an interrupted save leaves entries in both
+    tiers; they are dropped from the shard when the car is loaded again.
+    """
+
+    def __init__(self, hass: HomeAssistant, delay: float = DEFAULT_SAVE_DELAY) -> None:
+        self.hass = hass
+        self.delay = delay
+        self.data: dict = {"cars": {}}
+        self._index_store = CarLogStore(hass, STORAGE_VERSION, STORAGE_KEY_INDEX)
+        self._index: dict = {"cars": {}}
+        self._index_dirty = False
+        # Per-car state of the loaded cars: {"ui": drafts, "summary": ..., "statistics": marker}
+        self._states: dict[str, dict] = {}
+        self._state_stores: dict[str, CarLogStore] = {}
+        self._state_dirty: set[str] = set()
+        self._state_hashes: dict[str, str] = {}
+        self._stores: dict[str, CarLogStore] = {}
+        self._journals: dict[str, CarJournal] = {}
+        self._archives: dict[str, CarArchive] = {}
+        self._transaction_locks: dict[str, asyncio.Lock] = {}
+        self._repos: dict[str, CarRepository] = {}
+        # Cars in self.data served from their summary; history not loaded yet
+        self._summarized: set[str] = set()
+        # Journal size and shard stamp of each car not loaded yet, as found at startup
+        self._on_disk: dict[str, tuple[int, list[int] | None]] = {}
+        # Summaries still found in an index written before they moved to the car states
+        self._legacy_summaries: dict[str, dict] = {}
+        # Stamp of the shard of each loaded car, for its next summary
+        self._shard_stamps: dict[str, list[int] | None] = {}
+        self._dirty: set[str] = set()
+        self._hashes: dict[str, str] = {}
+        self._unsub_timer = None
+        self._lock = asyncio.Lock()
+        self._load_lock = asyncio.Lock()
+        self._loaded = False
+        self._started = False
+        self.files_written = 0
+        self.bytes_written = 0
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_FINAL_WRITE, self._async_final_write)
+        async_at_started(hass, self._async_started)
+
+    async def async_load(self) -> dict:
+        """Load the index once, migrating the single-file layout if needed."""
+        async with self._load_lock:
+            if not self._loaded:
+                with get_instrumentation(self.hass).timed(None, "startup.load"):
+                    await self._async_load()
+                self._loaded = True
+        return self.data
+
+    async def _async_load(self) -> None:
+        index = await self._index_store.async_load()
+        if index is None:
+            await self._async_migrate_single_file()
+        else:
+            self._index = index
+            self._legacy_summaries = {
+                car_id: info.pop("summary") for car_id, info in self._index["cars"].items() if "summary" in info
+            }
+            if self._index_store.migrated or self._legacy_summaries:
+                self._index_dirty = True
+                self._async_start_timer()
+            # One executor job for all journals and shards, to check which summaries are current
+            paths = {
+                car_id: (self._journal_path(car_id), self._store_for(car_id).path)
+                for car_id in self._index["cars"]
+            }
+            self._on_disk = await self.hass.async_add_executor_job(_files_on_disk, paths)
+        await self._async_migrate_drafts()
+
+    async def _async_migrate_single_file(self) -> None:
+        legacy_store = CarLogStore(self.hass, STORAGE_VERSION, STORAGE_KEY)
+        legacy = await legacy_store.async_load()
+        if not legacy:
+            return
+
+        cars = legacy.get("cars", {})
+        for car_id, car in cars.items():
+            self._index["cars"][car_id] = {"key": self._new_key(car_id)}
+            self.data["cars"][car_id] = self._attach_ui(car_id, car)
+
+        await asyncio.gather(*(self._async_save_car(car_id) for car_id in cars))
+        await self._async_save(None, self._index_store, self._index, len(_dump(self._index)))
+        await legacy_store.async_remove()
+        _LOGGER.info("Migrated %s cars from %s to per-car storage", len(cars), STORAGE_KEY)
+
+    async def _async_migrate_drafts(self) -> None:
+        """Split the drafts of the whole fleet, kept in one file before, into the car states."""
+        legacy_store = CarLogStore(self.hass, STORAGE_VERSION, STORAGE_KEY_UI)
+        legacy = await legacy_store.async_load()
+        if legacy is None:
+            return
+
+        cars = [car_id for car_id in legacy.get("cars", {}) if car_id in self._index["cars"]]
+        for car_id in cars:
+            self._states[car_id] = {"ui": legacy["cars"][car_id]}
+        await asyncio.gather(*(self._async_save_state(car_id) for car_id in cars))
+        await legacy_store.async_remove()
+        _LOGGER.info("Migrated the drafts of %s cars from %s to per-car storage", len(cars), STORAGE_KEY_UI)
+
+    def _new_key(self, car_id: str) -> str:
+        used = {info["key"] for info in self._index["cars"].values()}
+        base = f"{STORAGE_KEY}.{slugify(car_id) or 'car'}"
+        key = base
+        n = 2
+        while key in used:
+            key = f"{base}_{n}"
+            n += 1
+        return key
+
+    def car_ids(self) -> list[str]:
+        """All known cars, loaded or not."""
+        return list(self._index["cars"])
+
+    def _store_for(self, car_id: str) -> CarLogStore:
+        store = self._stores.get(car_id)
+        if store is None:
+            key = self._index["cars"][car_id]["key"]
+            store = self._stores[car_id] = CarLogStore(self.hass, STORAGE_VERSION, key)
+        return store
+
+    def _state_store_for(self, car_id: str) -> CarLogStore:
+        store = self._state_stores.get(car_id)
+        if store is None:
+            key = self._index["cars"][car_id]["key"]
+            store = self._state_stores[car_id] = CarLogStore(self.hass, STORAGE_VERSION, f"{key}.state")
+        return store
+
+    async def _async_load_state(self, car_id: str) -> None:
+        if car_id in self._states:
+            return
+        state = await self._state_store_for(car_id).async_load() or {}
+        self._states[car_id] = state
+        self._state_hashes[car_id] = _hash(_dump(state))
+
+    def history_loaded(self, car_id: str) -> bool:
+        return car_id in self.data["cars"] and car_id not in self._summarized
+
+    async def async_get_car(self, car_id: str, history: bool = True) -> dict:
+        """Return a car, loading its shard or creating it when unknown.
+
+        With history=False a car with a current summary is served from it:
+        meta, drafts and summary-backed repository only. Anything that reads
+        or changes fuel or maintenance entries, or the meta, needs history.
+        """
+        cars = self.data["cars"]
+        if car_id in cars and (not history or car_id not in self._summarized):
+            return cars[car_id]
+
+        async with self._load_lock:
+            if car_id in cars and (not history or car_id not in self._summarized):
+                return cars[car_id]
+
+            if car_id not in self._index["cars"]:
+                self._index["cars"][car_id] = {"key": self._new_key(car_id)}
+                self._index_dirty = True
+                self._states[car_id] = {}
+                cars[car_id] = self._attach_ui(car_id, _new_car())
+                self.async_schedule_save(car_id)
+                return cars[car_id]
+
+            await self._async_load_state(car_id)
+            state = self._states[car_id]
+            if "summary" not in state and car_id in self._legacy_summaries:
+                state["summary"] = self._legacy_summaries.pop(car_id)
+                self._state_dirty.add(car_id)
+                self._async_start_timer()
+            if not history:
+                summary = state.get("summary")
+                if summary is not None and is_current(summary, *self._on_disk.pop(car_id, (None, None))):
+                    car = {"meta": copy.deepcopy(summary["meta"]), "journal_seq": summary["journal_seq"]}
+                    cars[car_id] = self._attach_ui(car_id, car)
+                    self._repos[car_id] = CarSummary(
+                        car, summary, partial(get_instrumentation(self.hass).timed, car_id)
+                    )
+                    self._summarized.add(car_id)
+                    return car
+
+            with get_instrumentation(self.hass).timed(car_id, "history.load"):
+                car = await self._async_load_car(car_id)
+            self._summarized.discard(car_id)
+            cars[car_id] = car
+            return car
+
+    async def _async_load_car(self, car_id: str) -> dict:
+        # A summary-backed repository must not survive the load
+        self._repos.pop(car_id, None)
+        store = self._store_for(car_id)
+        car = await store.async_load() or _new_car()
+        if "ui" in car or store.migrated:
+            # Shard written before drafts moved out or in an older schema: rewrite it
+            self.async_schedule_save(car_id)
+        # Not hashed here: a shard is only scheduled after a change, so
+        # serializing every history just to compare it later is wasted work
+        car = self._attach_ui(car_id, car)
+
+        self._shard_stamps[car_id] = await self.hass.async_add_executor_job(file_stamp, store.path)
+        archive = self._archive_for(car_id)
+        await self.hass.async_add_executor_job(archive.load)
+        if archive.has_pending:
+            # Monthly sums summed again for another time zone
+            self.async_schedule_save(car_id)
+        events = await self._journal_for(car_id).async_read(car.get("journal_seq", 0))
+        repo = self._repos[car_id] = self._new_repository(car_id, car)
+        if events:
+            # None for states from before ui_seq, whose drafts were saved last
+            ui_seq = self._states[car_id].get("ui_seq")
+            for event in events:
+                apply_event(car, repo, event, replay=ui_seq is None or event["seq"] <= ui_seq)
+            car["journal_seq"] = events[-1]["seq"]
+            _LOGGER.debug("Replayed %s journal events for %s", len(events), car_id)
+        if repo.drop_archived():
+            self.async_schedule_save(car_id)
+        return car
+
+    def repository(self, car_id: str) -> CarRepository:
+        """Indexed access to the history of a loaded car."""
+        repo = self._repos.get(car_id)
+        if repo is None:
+            car = self.data["cars"].get(car_id)
+            if car is None:
+                # Not loaded (yet): serve an empty history without registering the car
+                return CarRepository(_new_car())
+            repo = self._repos[car_id] = self._new_repository(car_id, car)
+        return repo
+
+    def _new_repository(self, car_id: str, car: dict) -> CarRepository:
+        return CarRepository(car, partial(get_instrumentation(self.hass).timed, car_id), self._archive_for(car_id))
+
+    def _archive_for(self, car_id: str) -> CarArchive:
+        archive = self._archives.get(car_id)
+        if archive is None:
+            key = self._index["cars"][car_id]["key"]
+            archive = self._archives[car_id] = CarArchive(self.hass.config.path(".storage", key))
+        return archive
+
+    def _journal_path(self, car_id: str) -> str:
+        key = self._index["cars"][car_id]["key"]
+        return self.hass.config.path(".storage", f"{key}.journal")
+
+    def _journal_for(self, car_id: str) -> CarJournal:
+        journal = self._journals.get(car_id)
+        if journal is None:
+            journal = self._journals[car_id] = CarJournal(self.hass, self._journal_path(car_id))
+        return journal
+
+    @callback
+    def _async_refresh_summary(self, car_id: str) -> None:
+        """Put the current summary of a loaded car in its state, if it changed."""
+        summary = summarize(
+            self.repository(car_id), self._journal_for(car_id).size, self._shard_stamps.get(car_id)
+        )
+        state = self._states[car_id]
+        if state.get("summary") != summary:
+            state["summary"] = summary
+            self._state_dirty.add(car_id)
+
+    async def async_append_events(self, car_id: str, events: list[dict]) -> None:
+        """Persist history events by appending them to the journal, before they are applied.
+
+        The caller applies them afterwards and then advances car["journal_seq"],
+        holding ``transaction_lock`` throughout, so no snapshot claims an event
+        it does not contain. Raises OSError when they could not be written.
+        """
+        seq = self.data["cars"][car_id].get("journal_seq", 0)
+        for offset, event in enumerate(events, start=1):
+            event["seq"] = seq + offset
+        journal = self._journal_for(car_id)
+        await journal.async_append(events)
+        if journal.entries >= JOURNAL_MAX_ENTRIES or journal.size >= JOURNAL_MAX_BYTES:
+            self.async_schedule_save(car_id)
+
+    def transaction_lock(self, car_id: str) -> asyncio.Lock:
+        """Held while the changes of one action on a car are written and applied."""
+        lock = self._transaction_locks.get(car_id)
+        if lock is None:
+            lock = self._transaction_locks[car_id] = asyncio.Lock()
+        return lock
+
+    def _attach_ui(self, car_id: str, car: dict) -> dict:
+        """Point car["ui"] at the drafts in the car state, adopting drafts from old shards."""
+        legacy_ui = car.pop("ui", None)
+        state = self._states.setdefault(car_id, {})
+        if "ui" not in state:
+            state["ui"] = legacy_ui or {}
+            self.async_schedule_ui_save(car_id)
+        car["ui"] = state["ui"]
+        return car
+
+    @callback
+    def async_schedule_save(self, car_id: str, force: bool = False) -> None:
+        """Mark the history shard of a car for the next flush.
+
+        With force it is written even when unchanged since the last write.
+        """
+        if force:
+            self._hashes.pop(car_id, None)
+        self._dirty.add(car_id)
+        self._async_start_timer()
+
+    def statistics_marker(self, car_id: str) -> dict:
+        """What was last published as long-term statistics for a loaded car."""
+        state = self._states.get(car_id, {})
+        if "statistics" in state:
+            return state["statistics"]
+        # Kept in the meta before it moved to the car state
+        return self.data["cars"].get(car_id, {}).get("meta", {}).get("statistics") or {}
+
+    @callback
+    def async_set_statistics_marker(self, car_id: str, marker: dict) -> None:
+        """Store the marker in the car state, written with the next flush.
+
+        It starts no write of its own: should a crash lose it, the statistics
+        of the car are published again.
+        """
+        self._states.setdefault(car_id, {})["statistics"] = marker
+        # Left in the shard until its next snapshot; the state takes precedence
+        self.data["cars"][car_id].get("meta", {}).pop("statistics", None)
+        self._state_dirty.add(car_id)
+
+    @callback
+    def async_schedule_ui_save(self, car_id: str, journaled: bool = False) -> None:
+        """Mark the draft input values of a car for the next flush.
+
+        Journaled drafts are also in the journal (see ``CarTransaction``), so
+        they wait for a flush that is due anyway.
+        """
+        self._state_dirty.add(car_id)
+        if not journaled:
+            self._async_start_timer()
+
+    @callback
+    def _async_start_timer(self) -> None:
+        # Until started, pending writes wait for the flush in _async_started
+        if self._started and self._unsub_timer is None:
+            self._unsub_timer = async_call_later(self.hass, self.delay, self._async_timer_fired)
+
+    async def _async_started(self, _hass: HomeAssistant) -> None:
+        """Write what the setup of all config entries changed, at most once per file."""
+        self._started = True
+        instrumentation = get_instrumentation(self.hass)
+        start = time.perf_counter()
+        try:
+            await self.async_flush()
+        finally:
+            flush_ms = (time.perf_counter() - start) * 1000
+            load = instrumentation.histograms(prefix="startup.load").get("startup.load")
+            setup = instrumentation.histograms(prefix="setup_entry").get("setup_entry")
+            instrumentation.startup = report = {
+                "load_ms": round(load.total * 1000, 3) if load else None,
+                "cars_loaded": len(self.data["cars"]),
+                "histories_loaded": len(self.data["cars"]) - len(self._summarized),
+                "setup_entries": setup.count if setup else 0,
+                "setup_entries_ms": round(setup.total * 1000, 3) if setup else 0.0,
+                "flush_ms": round(flush_ms, 3),
+                "files_written": self.files_written,
+                "bytes_written": self.bytes_written,
+            }
+            if self._dirty or self._index_dirty or self._state_dirty:
+                self._async_start_timer()
+        _LOGGER.info(
+            "Started with %s cars (%s histories loaded): load %s ms, setup of %s entries %s ms, "
+            "wrote %s files (%s bytes) in %s ms",
+            report["cars_loaded"],
+            report["histories_loaded"],
+            report["load_ms"],
+            report["setup_entries"],
+            report["setup_entries_ms"],
+            report["files_written"],
+            report["bytes_written"],
+            report["flush_ms"],
+        )
+
+    async def _async_timer_fired(self, _now) -> None:
+        self._unsub_timer = None
+        await self.async_flush()
+
+    async def _async_final_write(self, _event: Event) -> None:
+        # Journal appends leave the summaries behind; catch up before the last write
+        for car_id in self.data["cars"]:
+            if car_id not in self._summarized:
+                self._async_refresh_summary(car_id)
+        await self.async_flush()
+
+    async def async_flush(self) -> None:
+        """Write pending changes now."""
+        if self._unsub_timer is not None:
+            self._unsub_timer()
+            self._unsub_timer = None
+
+        async with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            results = await asyncio.gather(
+                *(self._async_save_car(car_id) for car_id in dirty), return_exceptions=True
+            )
+            failed = [car_id for car_id, res in zip(dirty, results) if isinstance(res, Exception)]
+            # Keep failed shards pending so the next flush retries them
+            self._dirty.update(failed)
+            # The states go after the shards, so their summaries never describe unwritten shards
+            for car_id, res in zip(dirty, results):
+                if res is None and self.history_loaded(car_id):
+                    self._async_refresh_summary(car_id)
+
+            if self._index_dirty:
+                self._index_dirty = False
+                try:
+                    await self._async_save(None, self._index_store, self._index, len(_dump(self._index)))
+                except Exception:
+                    self._index_dirty = True
+                    raise
+
+            states, self._state_dirty = self._state_dirty, set()
+            state_results = await asyncio.gather(
+                *(self._async_save_state(car_id) for car_id in states), return_exceptions=True
+            )
+            self._state_dirty.update(
+                car_id for car_id, res in zip(states, state_results) if isinstance(res, Exception)
+            )
+
+            for res in (*results, *state_results):
+                if isinstance(res, Exception):
+                    raise res
+
+    async def _async_save_car(self, car_id: str) -> None:
+        car = self.data["cars"].get(car_id)
+        if car is None or car_id in self._summarized:
+            # Without its history a car must never overwrite its shard
+            return
+        await self._async_archive(car_id, car)
+        shard = _shard(car)
+        raw = _dump(shard)
+        digest = _hash(raw)
+        if digest != self._hashes.get(car_id):
+            store = self._store_for(car_id)
+            # Unknown until written: a summary made meanwhile must not match the old shard
+            self._shard_stamps.pop(car_id, None)
+            await self._async_save(car_id, store, shard, len(raw))
+            self._hashes[car_id] = digest
+            self._shard_stamps[car_id] = await self.hass.async_add_executor_job(file_stamp, store.path)
+
+        journal = self._journal_for(car_id)
+        if journal.entries:
+            await journal.async_compact(shard.get("journal_seq", 0))
+
+    async def _async_save_state(self, car_id: str) -> None:
+        state = self._states.get(car_id)
+        if state is None:
+            return
+        car = self.data["cars"].get(car_id)
+        if car is not None:
+            # The drafts include every event up to here; replay applies later ones
+            state["ui_seq"] = car.get("journal_seq", 0)
+        raw = _dump(state)
+        digest = _hash(raw)
+        if digest != self._state_hashes.get(car_id):
+            # A copy: drafts edited while the store serializes stay out of this write
+            await self._async_save(car_id, self._state_store_for(car_id), copy.deepcopy(state), len(raw))
+            self._state_hashes[car_id] = digest
+
+    async def _async_archive(self, car_id: str, car: dict) -> None:
+        """Move entries past the retention of the car to its archive, and write what is pending."""
+        years = car.get("meta", {}).get("retention_years")
+        repo = self.repository(car_id)
+        if years:
+            repo.archive_before(now_us() - int(years * _YEAR_US))
+        archive = repo.archive
+        if archive is None or not archive.has_pending:
+            return
+        with get_instrumentation(self.hass).timed(car_id, "archive.write"):
+            maps, size = await self.hass.async_add_executor_job(archive.write)
+        archive.attach(maps)
+        self.files_written += 3
+        self.bytes_written += size
+
+    async def _async_save(self, car_id: str | None, store: Store, data: dict, size: int) -> None:
+        start = time.perf_counter()
+        await store.async_save(data)
+        get_instrumentation(self.hass).record_save(car_id, time.perf_counter() - start, size)
+        self.files_written += 1
+        self.bytes_written += size
+
+
+def _shard(car: dict) -> dict:
+    """Snapshot of the history part of a car as written to its shard.
+
+    Lists are copied (and the fuel log turned into plain columns) so events
+    applied while the store serializes in the executor cannot leak into a
+    snapshot that claims an older journal_seq.
+    """
+    shard = {}
+    for key, value in car.items():
+        if key == "ui":
+            continue
+        if isinstance(value, FuelLog):
+            value = value.to_columns()
+        elif isinstance(value, list):
+            value = list(value)
+        elif isinstance(value, dict):
+            value = {k: list(v) if isinstance(v, list) else v for k, v in value.items()}
+        shard[key] = value
+    return shard
+
+
+def _files_on_disk(paths: dict[str, tuple[str, str]]) -> dict[str, tuple[int, list[int] | None]]:
+    """Journal size (0 when missing) and shard stamp per car. Runs in the executor."""
+    found = {}
+    for car_id, (journal_path, shard_path) in paths.items():
+        try:
+            journal_size = os.path.getsize(journal_path)
+        except FileNotFoundError:
+            journal_size = 0
+        found[car_id] = (journal_size, file_stamp(shard_path))
+    return found
+
+
+def _dump(data: dict) -> bytes:
+    return json.dumps(data, sort_keys=True, separators=(",", ":")).encode()
+
+
+def _hash(raw: bytes) -> str:
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import copy
+import os
+from collections.abc import Callable
+from contextlib import AbstractContextManager
+
+from .columns import FuelLog
+from .const import FUEL_RECENT_FILLS, FUEL_WINDOW_DAYS, MONTHS_SHOWN
+from .repository import CarRepository, _untimed
+from .stats import FuelBucket, FuelStats
+from .timestamps import local_time_zone, now_us
+
+_DAY_US = 86_400_000_000
+
+
+def file_stamp(path: str) -> list[int] | None:
+    """Size and modification time of a file, None if it is missing. Runs in the executor."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def is_current(summary: dict, journal_size: int | None, shard: list[int] | None) -> bool:
+    """Whether a persisted summary still describes the car.
+
+    Neither the journal nor the shard may have changed since it was made: a
+    shard written without the index that follows it leaves the summary
+    behind. Its monthly sums are keyed by local month, so they also only
+    hold in the time zone they were made in.
+    """
+    return (
+        summary["journal_size"] == journal_size
+        and summary.get("shard") == shard
+        and summary.get("time_zone") == local_time_zone()
+    )
+
+
+def summarize(repo: CarRepository, journal_size: int, shard: list[int] | None) -> dict:
+    """Compact summary of a loaded car: everything its entities read.
+
+    Besides the lifetime and recent monthly sums it keeps the last fill-ups:
+    enough for the recent average and for the trailing window from now on,
+    which only shrinks until the next fill-up (and that loads the history).
+    journal_size and the shard's ``file_stamp`` tell whether the files still
+    match at the next start.
+    """
+    fuel = repo.fuel
+    stats = repo.fuel_stats
+    window = stats.index_before(now_us() - FUEL_WINDOW_DAYS * _DAY_US)
+    start = min(len(fuel) - FUEL_RECENT_FILLS - 1, window)
+    months = stats.months
+    maintenance = {}
+    for maint_type in repo.maintenance_types():
+        latest = repo.maintenance(maint_type).latest()
+        maintenance[maint_type] = {
+            "count": repo.maintenance_count(maint_type),
+            "latest": dict(latest) if latest else None,
+        }
+    return {
+        "journal_seq": repo.car.get("journal_seq", 0),
+        "journal_size": journal_size,
+        "shard": shard,
+        "time_zone": local_time_zone(),
+        "meta": copy.deepcopy(repo.car.get("meta", {})),
+        "fuel": {
+            "count": stats.count,
+            "total": stats.total.to_list(),
+            "months": {month: months[month].to_list() for month in sorted(months)[-MONTHS_SHOWN:]},
+            "tail": FuelLog.from_entries(stats.entries_from(start)).to_columns(),
+        },
+        "maintenance": maintenance,
+        "archived": repo.archived_counts(),
+    }
+
+
+class SummaryStats(FuelStats):
+    """FuelStats of a car whose history is not loaded, read from its summary."""
+
+    def __init__(self, summary: dict) -> None:
+        self.fuel = FuelLog.from_columns(summary["tail"])
+        self.archive = self._anchor = None
+        self.total = FuelBucket.from_list(summary["total"])
+        self.months = {month: FuelBucket.from_list(values) for month, values in summary["months"].items()}
+        self._count = summary["count"]
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def holds_months_from(self, start: str | None) -> bool:
+        """Whether months has every month from start (YYYY-MM) on; None means from the first."""
+        if len(self.months) < MONTHS_SHOWN:
+            # Fewer than the summary keeps, so these are all of them
+            return True
+        return start is not None and start >= min(self.months)
+
+
+class SummaryLog:
+    """Size and latest entry of a maintenance log that is not loaded."""
+
+    def __init__(self, count: int = 0, latest: dict | None = None) -> None:
+        self._count = count
+        self._latest = latest
+
+    def __len__(self) -> int:
+        return self._count
+
+    def latest(self) -> dict | None:
+        return self._latest
+
+
+class CarSummary(CarRepository):
+    """Read-only repository of a car served from its persisted summary.
+
+    Answers what the entities ask for (fuel_stats, latest maintenance,
+    memoized values) without the history in memory; ``fuel`` only holds the
+    last fill-ups. Everything that reads or changes the full history loads
+    the car first (``CarLogStorage.async_get_car``), which replaces this.
+    """
+
+    def __init__(
+        self, car: dict, summary: dict, timed: Callable[[str], AbstractContextManager] | None = None
+    ) -> None:
+        self.car = car
+        self._timed = timed or _untimed
+        self.fuel_stats = SummaryStats(summary["fuel"])
+        self.fuel = self.fuel_stats.fuel
+        self._logs = {
+            maint_type: SummaryLog(info["count"], info["latest"])
+            for maint_type, info in summary["maintenance"].items()
+        }
+        self.archive = None
+        self._archived = summary.get("archived")
+        self.revision = 0
+        self._memo = {}
+
+    def maintenance(self, maint_type: str, create: bool = False) -> SummaryLog:
+        return self._logs.get(maint_type) or SummaryLog()
+
+    def maintenance_types(self) -> list[str]:
+        return list(self._logs)
+
+    def maintenance_count(self, maint_type: str) -> int:
+        return len(self.maintenance(maint_type))
+
+    def archived_counts(self) -> dict[str, int] | None:
+        return self._archived
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import datetime as dt
+
+from homeassistant.util import dt as dt_util
+
+# History timestamps are integer microseconds since the epoch (UTC). They are
+# compared and sorted as integers and only formatted as ISO for display.
+EPOCH = dt.datetime(1970, 1, 1, tzinfo=dt.timezone.utc)
+_US = dt.timedelta(microseconds=1)
+
+
+def to_us(value: int | str | dt.datetime) -> int:
+    """Epoch microseconds of an ISO string, a datetime or an existing timestamp."""
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        value = dt.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=dt.timezone.utc)
+    return (value - EPOCH) // _US
+
+
+def to_datetime(us: int) -> dt.datetime:
+    return EPOCH + dt.timedelta(microseconds=us)
+
+
+def to_iso(us: int | None) -> str | None:
+    return to_datetime(us).isoformat() if us is not None else None
+
+
+def local_time_zone() -> str:
+    return str(dt_util.as_local(dt_util.utcnow()).tzinfo)
+
+
+def month_of(us: int) -> str:
+    """The "YYYY-MM" month of a timestamp in the local time zone."""
+    return dt_util.as_local(to_datetime(us)).strftime("%Y-%m")
+
+
+def month_bounds(month: str) -> tuple[int, int]:
+    """Start of a local "YYYY-MM" month and of the next one, as epoch microseconds."""
+    local_tz = dt_util.as_local(dt_util.utcnow()).tzinfo
+    year, number = (int(part) for part in month.split("-"))
+    start = dt.datetime(year, number, 1, tzinfo=local_tz)
+    end = dt.datetime(year + number // 12, number % 12 + 1, 1, tzinfo=local_tz)
+    return to_us(start), to_us(end)
+
+
+def months_between(first_us: int, last_us: int) -> list[str]:
+    """The local months from the one of first_us up to the one of last_us."""
+    months = [month_of(first_us)]
+    last = month_of(last_us)
+    while months[-1] < last:
+        year, number = (int(part) for part in months[-1].split("-"))
+        months.append(f"{year + number // 12:04d}-{number % 12 + 1:02d}")
+    return months
+
+
+def now_us() -> int:
+    return to_us(dt.datetime.now(dt.timezone.utc))
+
+
+def day_start_us(value: str | dt.date, tz: dt.tzinfo, days: int = 0) -> int:
+    """Start of a calendar day in tz (shifted by days), as epoch microseconds."""
+    if isinstance(value, str):
+        value = dt.date.fromisoformat(value)
+    value += dt.timedelta(days=days)
+    return to_us(dt.datetime(value.year, value.month, value.day, tzinfo=tz))